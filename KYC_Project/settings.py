@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'kyc',
     'rest_framework',
     'rest_framework.authtoken',
@@ -59,9 +60,26 @@ DIDIT_CLIENT_ID = os.getenv('DIDIT_CLIENT_ID')
 DIDIT_CLIENT_SECRET = os.getenv('DIDIT_CLIENT_SECRET')
 DIDIT_WEBHOOK_SECRET = os.getenv('DIDIT_WEBHOOK_SECRET')
 TUNNEL_URL = os.getenv('TUNNEL_URL')  # Usar esta variable en lugar de WEBHOOK_URL
+# Cuota compartida por todos los workers para las llamadas a la API de Didit
+DIDIT_RATE_LIMIT_PER_MINUTE = int(os.getenv('DIDIT_RATE_LIMIT_PER_MINUTE', 60))
+DIDIT_RATE_LIMIT_BURST = int(os.getenv('DIDIT_RATE_LIMIT_BURST', DIDIT_RATE_LIMIT_PER_MINUTE))
+# Profiling por request: token de la cabecera X-KYC-Profile y fracción de requests muestreadas
+KYC_PROFILING_TOKEN = os.getenv('KYC_PROFILING_TOKEN')
+KYC_PROFILING_SAMPLE_RATE = float(os.getenv('KYC_PROFILING_SAMPLE_RATE', 0))
 
 ALLOWED_HOSTS = ['localhost', '127.0.0.1', '0.0.0.0',  '.vercel.app']
 
+# Caché compartida (Redis) si REDIS_URL está definido; si no, caché local por proceso.
+# La usa GET /kyc/api/status/ para responder 304 sin consultar la base de datos.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+KYC_STATUS_CACHE_TIMEOUT = int(os.getenv('KYC_STATUS_CACHE_TIMEOUT', 60))
+
 
 MIDDLEWARE = [
     #THIRD PARTY MIDDLEWARE
@@ -71,6 +89,9 @@ MIDDLEWARE = [
     'whitenoise.middleware.WhiteNoiseMiddleware',
     
     
+    # Profiling bajo demanda (muestreo o cabecera X-KYC-Profile), ver kyc/middleware.py
+    'kyc.middleware.RequestProfilingMiddleware',
+
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
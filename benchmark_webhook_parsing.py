@@ -0,0 +1,105 @@
+"""
+Benchmark de memoria del parseo de webhooks de Didit.
+
+Compara el pico de memoria (RSS) de leer el payload completo con
+request.body + json.loads (implementación anterior) frente a la extracción
+por streaming de kyc/utils/json_stream.py. Cada modo corre en un proceso
+aparte para que el pico de RSS de uno no contamine al otro.
+
+Uso: python benchmark_webhook_parsing.py [--image-mb 8] [--images 3]
+"""
+import argparse
+import base64
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+FIELDS = (
+    ("session_id",),
+    ("id",),
+    ("status",),
+    ("timestamp",),
+    ("created_at",),
+    ("decision", "kyc", "*"),
+)
+
+
+def build_payload(path, image_mb, images):
+    # Imágenes en base64 como las que Didit puede incluir en la decisión
+    image = base64.b64encode(os.urandom(image_mb * 1024 * 1024)).decode()
+    payload = {
+        "session_id": "benchmark-session",
+        "status": "Approved",
+        "created_at": 1741019400,
+        "decision": {
+            "kyc": {
+                "document_number": "X1234567",
+                "last_name": "Doe",
+                "issuing_state_name": "Colombia",
+                **{f"image_{i}": image for i in range(images)},
+            },
+        },
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f)
+
+
+def peak_rss_mb():
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode, path):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from kyc.utils.json_stream import extract_fields
+
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        if mode == "json":
+            # Igual que antes: request.body completo, decodificado para el log y json.loads
+            body = f.read()
+            body.decode("utf-8")
+            data = json.loads(body)
+        else:
+            data = extract_fields(f, FIELDS)
+    elapsed = time.perf_counter() - start
+    assert data["decision"]["kyc"]["document_number"] == "X1234567"
+    print(json.dumps({"peak_rss_mb": peak_rss_mb(), "baseline_rss_mb": baseline, "seconds": elapsed}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image-mb", type=int, default=8, help="Tamaño (MB, antes de base64) de cada imagen")
+    parser.add_argument("--images", type=int, default=3, help="Número de imágenes en el payload")
+    parser.add_argument("--mode", choices=["json", "stream"], help=argparse.SUPPRESS)
+    parser.add_argument("--file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.file)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "payload.json")
+        build_payload(path, args.image_mb, args.images)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f"Payload: {size_mb:.1f} MB\n")
+        print(f"{'modo':<8}{'RSS pico (MB)':>15}{'incremento (MB)':>18}{'tiempo (s)':>12}")
+        for mode in ("json", "stream"):
+            output = subprocess.check_output(
+                [sys.executable, __file__, "--mode", mode, "--file", path], text=True
+            )
+            result = json.loads(output)
+            print(
+                f"{mode:<8}{result['peak_rss_mb']:>15.1f}"
+                f"{result['peak_rss_mb'] - result['baseline_rss_mb']:>18.1f}{result['seconds']:>12.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,162 @@
+import zlib
 from django.contrib import admin
-from .models import UserDetails, SessionDetails
+from django.db.models import Q
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from django.utils.text import smart_split, unescape_string_literal
+from .models import UserDetails, SessionDetails, RequestProfile
+from .utils.paginator import EstimatedCountPaginator
+from .utils.session_state import STATUS_RANKS, FINAL_STATUSES
+from .utils.status_cache import invalidate_statuses
 
 @admin.register(UserDetails)
 class UserDetailsAdmin(admin.ModelAdmin):
     list_display = ('first_name', 'last_name', 'document_id', 'document_type', 'nationality', 'date_of_birth')
     search_fields = ('first_name', 'last_name', 'document_id')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    # Deleting a user deletes its session too
+    def delete_model(self, request, obj):
+        invalidate_statuses(SessionDetails.objects.filter(personal_data=obj).values_list('session_id', flat=True))
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        invalidate_statuses(
+            SessionDetails.objects.filter(personal_data__in=queryset).values_list('session_id', flat=True)
+        )
+        super().delete_queryset(request, queryset)
+
+class SessionStatusFilter(admin.SimpleListFilter):
+    """
+    Status filter with a fixed list of choices: the default filter for a
+    field without choices runs SELECT DISTINCT status over the whole table.
+    """
+    title = 'status'
+    parameter_name = 'status'
+
+    def lookups(self, request, model_admin):
+        statuses = sorted(STATUS_RANKS, key=STATUS_RANKS.get) + sorted(FINAL_STATUSES)
+        return [(status, status.capitalize()) for status in statuses]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(status=self.value())
+        return queryset
 
 @admin.register(SessionDetails)
 class SessionDetailsAdmin(admin.ModelAdmin):
     list_display = ('session_id', 'status', 'created_at', 'updated_at', 'personal_data')
-    list_filter = ('status', 'created_at')
+    list_select_related = ('personal_data',)
+    # No date_hierarchy: its links need SELECT DISTINCT over created_at for the
+    # whole table; the created_at filter gives date drill-down without a query
+    list_filter = (SessionStatusFilter, 'created_at')
     search_fields = ('session_id', 'personal_data__first_name', 'personal_data__last_name', 'personal_data__document_id')
+    ordering = ('-created_at',)
+    paginator = EstimatedCountPaginator
+    # Avoids the extra unfiltered COUNT(*) shown next to search results
+    show_full_result_count = False
+    raw_id_fields = ('personal_data',)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Same matches as search_fields, but each table is searched through its
+        own trigram index and the session pks are combined with UNION: an OR
+        across the join cannot use the indexes and scans both tables.
+        """
+        for term in smart_split(search_term):
+            if term.startswith(('"', "'")) and term[0] == term[-1]:
+                term = unescape_string_literal(term)
+            users = UserDetails.objects.filter(
+                Q(first_name__icontains=term) | Q(last_name__icontains=term) | Q(document_id__icontains=term)
+            ).values('pk')
+            matching = SessionDetails.objects.filter(session_id__icontains=term).values('pk').union(
+                SessionDetails.objects.filter(personal_data_id__in=users).values('pk')
+            )
+            queryset = queryset.filter(pk__in=matching)
+        return queryset, False
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Keep GET /kyc/api/status/ from serving the previous status
+        invalidate_statuses([obj.session_id, form.initial.get('session_id')])
+
+    def delete_model(self, request, obj):
+        invalidate_statuses([obj.session_id])
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        invalidate_statuses(queryset.values_list('session_id', flat=True))
+        super().delete_queryset(request, queryset)
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'status_code', 'duration_ms', 'query_count', 'query_ms',
+                    'outbound_count', 'outbound_ms', 'trigger')
+    list_filter = ('trigger', 'method', 'created_at')
+    search_fields = ('path',)
+    date_hierarchy = 'created_at'
+    exclude = ('report', 'pstats')
+    readonly_fields = ('created_at', 'method', 'path', 'status_code', 'trigger', 'duration_ms', 'query_count',
+                       'query_ms', 'outbound_count', 'outbound_ms', 'downloads', 'top_functions', 'sql_queries',
+                       'outbound_calls')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        urls = [
+            path('<int:pk>/download/<str:kind>/', self.admin_site.admin_view(self.download_view),
+                 name='kyc_requestprofile_download'),
+        ]
+        return urls + super().get_urls()
+
+    def download_view(self, request, pk, kind):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        if kind == 'prof' and profile.pstats:
+            response = HttpResponse(zlib.decompress(bytes(profile.pstats)), content_type='application/octet-stream')
+            response['Content-Disposition'] = f'attachment; filename="profile-{pk}.prof"'
+            return response
+        if kind == 'json':
+            response = JsonResponse(profile.report, json_dumps_params={'indent': 2})
+            response['Content-Disposition'] = f'attachment; filename="profile-{pk}.json"'
+            return response
+        raise Http404
+
+    @admin.display(description='Download')
+    def downloads(self, obj):
+        return format_html(
+            '<a href="{}">cProfile (.prof)</a> · <a href="{}">report (.json)</a>',
+            reverse('admin:kyc_requestprofile_download', args=[obj.pk, 'prof']),
+            reverse('admin:kyc_requestprofile_download', args=[obj.pk, 'json']),
+        )
+
+    def _table(self, headers, rows):
+        return format_html(
+            '<table><thead><tr>{}</tr></thead><tbody>{}</tbody></table>',
+            format_html_join('', '<th>{}</th>', ((header,) for header in headers)),
+            format_html_join('', '<tr>' + '<td>{}</td>' * len(headers) + '</tr>', rows),
+        )
+
+    @admin.display(description='Top functions (by cumulative time)')
+    def top_functions(self, obj):
+        return self._table(
+            ('cumulative ms', 'own ms', 'calls', 'function'),
+            ((f['cumtime_ms'], f['tottime_ms'], f['calls'], f['function']) for f in obj.report.get('functions', [])),
+        )
+
+    @admin.display(description='SQL queries')
+    def sql_queries(self, obj):
+        return self._table(('ms', 'SQL'), ((q['ms'], q['sql']) for q in obj.report.get('queries', [])))
+
+    @admin.display(description='Outbound Didit calls')
+    def outbound_calls(self, obj):
+        return self._table(
+            ('ms', 'method', 'status', 'URL'),
+            ((c['ms'], c['method'], c['status'], c['url']) for c in obj.report.get('outbound', [])),
+        )
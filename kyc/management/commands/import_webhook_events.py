@@ -0,0 +1,64 @@
+import json
+import sys
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from kyc.utils.webhook_events import apply_webhook_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Applies Didit webhook events in bulk from a JSON file: a list of events, "
+        "{\"events\": [...]} or one event per line."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSON file with the events, or '-' to read from stdin.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of events applied per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        events = self._load_events(options["path"])
+        batch_size = options["batch_size"]
+        totals = Counter()
+
+        for start in range(0, len(events), batch_size):
+            results = apply_webhook_events(events[start:start + batch_size])
+            for result in results:
+                totals[result["outcome"]] += 1
+                if result["outcome"] in ("invalid", "not_found"):
+                    self.stderr.write(
+                        f"Event {start + result['index']} ({result['session_id']}): {result['outcome']}"
+                    )
+
+        summary = ", ".join(f"{outcome}: {count}" for outcome, count in sorted(totals.items()))
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(events)} events ({summary})."))
+
+    def _load_events(self, path):
+        try:
+            if path == "-":
+                content = sys.stdin.read()
+            else:
+                with open(path, encoding="utf-8") as f:
+                    content = f.read()
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError:
+            try:
+                data = [json.loads(line) for line in content.splitlines() if line.strip()]
+            except json.JSONDecodeError as e:
+                raise CommandError(f"Invalid JSON in {path}: {e}")
+
+        if isinstance(data, dict):
+            data = data.get("events", [data])
+        if not isinstance(data, list):
+            raise CommandError("Expected a list of events.")
+        return data
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from kyc.utils.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the KYC funnel statistics counters from SessionDetails (backfill). "
+        "Run it once after deploying the counters, otherwise sessions created before "
+        "then leave the status counts wrong. New transitions wait while it runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Number of sessions fetched per database round trip.",
+        )
+
+    def handle(self, *args, **options):
+        processed = rebuild_stats(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt KYC stats from {processed} sessions."))
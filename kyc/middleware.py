@@ -0,0 +1,125 @@
+import cProfile
+import hmac
+import marshal
+import pstats
+import random
+import time
+import zlib
+from contextlib import ExitStack
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import RequestProfile
+from .utils.profiling import start_outbound_capture, stop_outbound_capture
+
+PROFILE_HEADER = "HTTP_X_KYC_PROFILE"
+TOP_FUNCTIONS = 40
+MAX_SQL_LENGTH = 1000
+MAX_QUERIES = 200
+
+
+class RequestProfilingMiddleware:
+    """
+    Profiles individual requests on demand: a random sample of them
+    (KYC_PROFILING_SAMPLE_RATE, 0 by default) and any request carrying an
+    ``X-KYC-Profile`` header equal to KYC_PROFILING_TOKEN.
+
+    A profiled request records its CPU profile, its SQL queries and its
+    outbound Didit calls with timings into a RequestProfile, viewable and
+    downloadable from the admin. Requests that are not profiled only pay
+    for a header lookup.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        trigger = self._trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+        return self._profile(request, trigger)
+
+    def _trigger(self, request):
+        header = request.META.get(PROFILE_HEADER)
+        if header:
+            token = getattr(settings, "KYC_PROFILING_TOKEN", None)
+            if token and hmac.compare_digest(header.encode(), token.encode()):
+                return "header"
+        sample_rate = getattr(settings, "KYC_PROFILING_SAMPLE_RATE", 0)
+        if sample_rate and random.random() < sample_rate:
+            return "sample"
+        return None
+
+    def _profile(self, request, trigger):
+        queries = []
+
+        def record_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                if len(queries) < MAX_QUERIES:
+                    queries.append({
+                        "sql": sql[:MAX_SQL_LENGTH],
+                        "ms": round((time.perf_counter() - start) * 1000, 3),
+                    })
+
+        profiler = cProfile.Profile()
+        outbound_token = start_outbound_capture()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(record_query))
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            outbound = stop_outbound_capture(outbound_token)
+
+        profile = self._save(request, response, trigger, duration_ms, profiler, queries, outbound)
+        if profile is not None:
+            response["X-KYC-Profile-Id"] = str(profile.pk)
+        return response
+
+    def _save(self, request, response, trigger, duration_ms, profiler, queries, outbound):
+        try:
+            stats = pstats.Stats(profiler)
+            functions = []
+            for (filename, line, name), (_, calls, tottime, cumtime, _) in sorted(
+                stats.stats.items(), key=lambda item: item[1][3], reverse=True
+            )[:TOP_FUNCTIONS]:
+                functions.append({
+                    "function": f"{filename}:{line}({name})",
+                    "calls": calls,
+                    "tottime_ms": round(tottime * 1000, 3),
+                    "cumtime_ms": round(cumtime * 1000, 3),
+                })
+
+            profile = RequestProfile.objects.create(
+                method=request.method,
+                path=request.path[:255],
+                status_code=getattr(response, "status_code", None),
+                trigger=trigger,
+                duration_ms=round(duration_ms, 3),
+                query_count=len(queries),
+                query_ms=round(sum(query["ms"] for query in queries), 3),
+                outbound_count=len(outbound),
+                outbound_ms=round(sum(call["ms"] for call in outbound), 3),
+                report={"functions": functions, "queries": queries, "outbound": outbound},
+                pstats=zlib.compress(marshal.dumps(stats.stats)),
+            )
+
+            retention_days = getattr(settings, "KYC_PROFILING_RETENTION_DAYS", 7)
+            RequestProfile.objects.filter(created_at__lt=timezone.now() - timedelta(days=retention_days)).delete()
+            return profile
+        except Exception as e:
+            # Profiling must never break the request it observes
+            print(f"⚠️ Error saving request profile: {str(e)}")
+            return None
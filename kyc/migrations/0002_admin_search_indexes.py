@@ -0,0 +1,57 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:56
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indexes are built with CREATE INDEX CONCURRENTLY so large tables keep
+    # accepting writes (webhooks, signups) while they are built
+    atomic = False
+
+    dependencies = [
+        ('kyc', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='sessiondetails',
+                    name='created_at',
+                    field=models.DateTimeField(auto_now_add=True, db_index=True),
+                ),
+            ],
+            # Same index (and name) AlterField would create, built concurrently
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE INDEX CONCURRENTLY IF NOT EXISTS "kyc_sessiondetails_created_at_9bdd2d8d" '
+                    'ON "kyc_sessiondetails" ("created_at");',
+                    reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS "kyc_sessiondetails_created_at_9bdd2d8d";',
+                ),
+            ],
+        ),
+        AddIndexConcurrently(
+            model_name='sessiondetails',
+            index=models.Index(fields=['status', 'created_at'], name='kyc_session_status_created'),
+        ),
+        AddIndexConcurrently(
+            model_name='sessiondetails',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('session_id'), name='gin_trgm_ops'), name='kyc_session_id_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='userdetails',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('first_name'), name='gin_trgm_ops'), name='kyc_user_first_name_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='userdetails',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('last_name'), name='gin_trgm_ops'), name='kyc_user_last_name_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='userdetails',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('document_id'), name='gin_trgm_ops'), name='kyc_user_document_id_trgm'),
+        ),
+    ]
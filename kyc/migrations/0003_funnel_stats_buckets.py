@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kyc', '0002_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompletionTimeBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('le_seconds', models.PositiveIntegerField()),
+                ('count', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('hour', 'le_seconds'), name='kyc_completion_bucket_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SessionStatusBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('status', models.CharField(max_length=50)),
+                ('entered', models.PositiveBigIntegerField(default=0)),
+                ('exited', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('hour', 'status'), name='kyc_status_bucket_unique')],
+            },
+        ),
+    ]
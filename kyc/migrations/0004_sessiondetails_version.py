@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 07:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kyc', '0003_funnel_stats_buckets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessiondetails',
+            name='version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-19 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kyc', '0006_request_profile'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='completiontimebucket',
+            name='kyc_completion_bucket_unique',
+        ),
+        migrations.RemoveConstraint(
+            model_name='sessionstatusbucket',
+            name='kyc_status_bucket_unique',
+        ),
+        migrations.AddField(
+            model_name='completiontimebucket',
+            name='shard',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sessionstatusbucket',
+            name='shard',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='completiontimebucket',
+            constraint=models.UniqueConstraint(fields=('hour', 'le_seconds', 'shard'), name='kyc_completion_bucket_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='sessionstatusbucket',
+            constraint=models.UniqueConstraint(fields=('hour', 'status', 'shard'), name='kyc_status_bucket_unique'),
+        ),
+    ]
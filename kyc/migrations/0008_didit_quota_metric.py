@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-19 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kyc', '0007_stats_bucket_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiditQuotaMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('priority', models.CharField(max_length=20, unique=True)),
+                ('requests', models.PositiveBigIntegerField(default=0)),
+                ('waited', models.PositiveBigIntegerField(default=0)),
+                ('timeouts', models.PositiveBigIntegerField(default=0)),
+                ('total_wait_seconds', models.FloatField(default=0)),
+                ('max_wait_seconds', models.FloatField(default=0)),
+            ],
+        ),
+    ]
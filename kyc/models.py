@@ -1,4 +1,6 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 
 class UserDetails(models.Model):
     first_name = models.CharField(max_length=255)
@@ -8,6 +10,15 @@ class UserDetails(models.Model):
     nationality = models.CharField(max_length=100, null=True, blank=True)
     date_of_birth = models.DateField(null=True, blank=True)
 
+    class Meta:
+        # Trigram indexes on UPPER(column) back the admin's icontains searches,
+        # which PostgreSQL compiles to UPPER(column::text) LIKE UPPER(%s).
+        indexes = [
+            GinIndex(OpClass(Upper("first_name"), name="gin_trgm_ops"), name="kyc_user_first_name_trgm"),
+            GinIndex(OpClass(Upper("last_name"), name="gin_trgm_ops"), name="kyc_user_last_name_trgm"),
+            GinIndex(OpClass(Upper("document_id"), name="gin_trgm_ops"), name="kyc_user_document_id_trgm"),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.document_id}"
 
@@ -15,8 +26,107 @@ class SessionDetails(models.Model):
     personal_data = models.OneToOneField(UserDetails, on_delete=models.CASCADE, related_name='session_details')
     session_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
     status = models.CharField(max_length=50, default="pending")
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Timestamp (microseconds) of the last webhook event applied, see kyc.utils.session_state
+    version = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Serves the admin's status filter combined with date ordering/drill-down
+            models.Index(fields=["status", "created_at"], name="kyc_session_status_created"),
+            GinIndex(OpClass(Upper("session_id"), name="gin_trgm_ops"), name="kyc_session_id_trgm"),
+        ]
+
     def __str__(self):
         return f"Session {self.session_id} - {self.status}"
+
+class SessionStatusBucket(models.Model):
+    """
+    Per hour and status counters of session transitions, maintained
+    incrementally by kyc.utils.stats so dashboards never aggregate SessionDetails.
+    Each counter is split over ``shard`` rows (summed on read) so concurrent
+    webhooks rarely wait on each other's row locks.
+    """
+    hour = models.DateTimeField()
+    status = models.CharField(max_length=50)
+    shard = models.PositiveSmallIntegerField(default=0)
+    entered = models.PositiveBigIntegerField(default=0)
+    exited = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["hour", "status", "shard"], name="kyc_status_bucket_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H:00} {self.status} +{self.entered}/-{self.exited}"
+
+class CompletionTimeBucket(models.Model):
+    """
+    Histogram of time-to-completion: number of sessions that finished in a
+    given hour taking at most ``le_seconds`` (and more than the previous bound).
+    Sharded like SessionStatusBucket.
+    """
+    hour = models.DateTimeField()
+    le_seconds = models.PositiveIntegerField()
+    shard = models.PositiveSmallIntegerField(default=0)
+    count = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["hour", "le_seconds", "shard"], name="kyc_completion_bucket_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H:00} <= {self.le_seconds}s: {self.count}"
+
+class DiditRateLimitBucket(models.Model):
+    """
+    Token bucket shared by every worker for outbound Didit API calls,
+    updated with compare-and-set UPDATEs by kyc.utils.didit_client.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    tokens = models.FloatField()
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name}: {self.tokens:.2f} tokens"
+
+class DiditQuotaMetric(models.Model):
+    """
+    Wait-time counters of the Didit quota scheduler per priority, shared by
+    every worker and updated with F-expression UPDATEs.
+    """
+    priority = models.CharField(max_length=20, unique=True)
+    requests = models.PositiveBigIntegerField(default=0)
+    waited = models.PositiveBigIntegerField(default=0)
+    timeouts = models.PositiveBigIntegerField(default=0)
+    total_wait_seconds = models.FloatField(default=0)
+    max_wait_seconds = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.priority}: {self.requests} requests, {self.timeouts} timeouts"
+
+class RequestProfile(models.Model):
+    """
+    Compact profile of a single request captured by
+    kyc.middleware.RequestProfilingMiddleware.
+    """
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    trigger = models.CharField(max_length=10)  # "header" or "sample"
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField(default=0)
+    query_ms = models.FloatField(default=0)
+    outbound_count = models.PositiveIntegerField(default=0)
+    outbound_ms = models.FloatField(default=0)
+    # Top functions, SQL queries and outbound calls with their timings
+    report = models.JSONField(default=dict)
+    # zlib-compressed marshal dump of the cProfile stats (a .prof file)
+    pstats = models.BinaryField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.method} {self.path} - {self.duration_ms:.1f} ms"
@@ -0,0 +1,75 @@
+import functools
+import itertools
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+
+from ..models import UserDetails, SessionDetails
+from .perf import PerfRecorder, UPDATE_BASELINE
+
+_recorder = PerfRecorder()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Session ids repeat across tests, so cached statuses must not leak between them."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(params=["queries", pytest.param("latency", marks=pytest.mark.perf)])
+def perf(request):
+    """
+    Runs each performance test twice: the exact query count check (default
+    run) and the latency check, marked ``perf`` and only run with ``-m perf``.
+    """
+    return SimpleNamespace(measure=functools.partial(_recorder.measure, timed=request.param == "latency"))
+
+
+@pytest.fixture
+def didit_mock():
+    """Patches the Didit client functions used by the views."""
+    counter = itertools.count()
+
+    def fake_create_session(features, callback_url, vendor_data):
+        return {"session_id": f"mock-session-{next(counter)}", "url": "https://verify.didit.me/mock"}
+
+    with mock.patch("kyc.views.create_session", side_effect=fake_create_session) as create, \
+            mock.patch("kyc.views.retrieve_session", return_value={"status": "Approved"}) as retrieve, \
+            mock.patch("kyc.views.retrieve_decision_fields", return_value={"status": "Approved"}) as decision, \
+            mock.patch("kyc.views.update_session_status", return_value={"status": "Approved"}) as update:
+        yield mock.Mock(
+            create_session=create, retrieve_session=retrieve, retrieve_decision_fields=decision,
+            update_session_status=update,
+        )
+
+
+@pytest.fixture
+def make_session(db):
+    """Creates a pending session with a unique session_id."""
+    counter = itertools.count()
+
+    def factory(status="pending"):
+        index = next(counter)
+        personal_data = UserDetails.objects.create(
+            first_name="John", last_name="Doe", document_id=f"DOC{index}"
+        )
+        return SessionDetails.objects.create(
+            personal_data=personal_data, session_id=f"session-{index}", status=status
+        )
+
+    return factory
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _recorder.results:
+        return
+    _recorder.finish()
+    terminalreporter.section("KYC performance")
+    for line in _recorder.report_lines():
+        terminalreporter.write_line(line)
+    if UPDATE_BASELINE:
+        terminalreporter.write_line("Baseline updated.")
@@ -0,0 +1,193 @@
+"""
+Helpers for the performance regression suite.
+
+Every endpoint is exercised with the Didit client mocked: one warm-up call
+and one call whose SQL queries are counted and must match exactly, which is
+deterministic and part of the default test run. The latency variant of each
+test (marked ``perf``) then makes ``KYC_PERF_RUNS`` timed calls whose latency
+distribution is compared with ``perf_baseline.json``. Baseline latencies are scaled by a calibration
+workload timed in the same run: a trivial view with one query requested
+through the test client, so it pays the same middleware, routing and
+database round trip overhead as the endpoints. A slower or busier machine
+does not fail the budget by itself, and sub-millisecond endpoints get an
+absolute headroom on top of the relative budget.
+
+The latency checks are excluded from the default run (see pytest.ini); run
+them with ``pytest -m perf``.
+
+Environment variables:
+    KYC_PERF_RUNS             timed calls per endpoint (default 30)
+    KYC_PERF_BUDGET           allowed relative slowdown of the median against
+                              the baseline, 1.0 meaning +100% (default 1.0)
+    KYC_PERF_MIN_HEADROOM_MS  minimum allowed slowdown in ms (default 1.0)
+    KYC_PERF_UPDATE_BASELINE  set to 1 to record the measured latencies as the
+                              new baseline instead of checking them, or to
+                              "new" to only add the endpoints missing from it
+                              (scaled to the recorded calibration)
+"""
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+
+BASELINE_PATH = Path(__file__).with_name("perf_baseline.json")
+PERF_RUNS = int(os.getenv("KYC_PERF_RUNS", 30))
+PERF_BUDGET = float(os.getenv("KYC_PERF_BUDGET", 1.0))
+MIN_HEADROOM_MS = float(os.getenv("KYC_PERF_MIN_HEADROOM_MS", 1.0))
+UPDATE_BASELINE = os.getenv("KYC_PERF_UPDATE_BASELINE") in ("1", "new")
+ADD_MISSING_ONLY = os.getenv("KYC_PERF_UPDATE_BASELINE") == "new"
+
+
+def load_baseline():
+    if not BASELINE_PATH.exists():
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+
+def save_baseline(baseline):
+    with open(BASELINE_PATH, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def calibration_view(request):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    return HttpResponse("ok")
+
+
+# Only routed while calibrating
+urlpatterns = [path("perf/calibration/", calibration_view)]
+
+
+def calibrate(runs=200):
+    """Median time (ms) of a request to a trivial view, used to compare machines."""
+    client = Client()
+    samples = []
+    with override_settings(ROOT_URLCONF=__name__):
+        for index in range(runs + 20):
+            start = time.perf_counter()
+            response = client.get("/perf/calibration/")
+            elapsed = (time.perf_counter() - start) * 1000
+            assert response.status_code == 200
+            # The first requests warm up caches and are not counted
+            if index >= 20:
+                samples.append(elapsed)
+    return statistics.median(samples)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class PerfRecorder:
+    """
+    Collects the measurements of one test session so they can be reported
+    at the end and, if requested, written back as the new baseline.
+    """
+
+    def __init__(self):
+        self.baseline = load_baseline()
+        self.results = {}
+        self.calibration_ms = None
+
+    def scale(self):
+        """Ratio between this machine's calibration time and the baseline's."""
+        recorded = self.baseline.get("calibration_ms")
+        if not recorded or not self.calibration_ms:
+            return 1.0
+        return self.calibration_ms / recorded
+
+    def measure(self, name, call, queries, setup=None, expected_status=200, timed=True):
+        """
+        Measures ``call(*setup())`` (``setup`` runs outside the timed region)
+        and asserts the exact number of SQL queries and, when ``timed``, the
+        latency budget.
+        """
+        setup = setup or (lambda: ())
+
+        response = call(*setup())
+        assert response.status_code == expected_status, response.content
+
+        args = setup()
+        with CaptureQueriesContext(connection) as captured:
+            response = call(*args)
+        assert response.status_code == expected_status, response.content
+        executed = [query["sql"] for query in captured.captured_queries]
+        assert len(executed) == queries, (
+            f"{name}: expected {queries} queries, got {len(executed)}:\n" + "\n".join(executed)
+        )
+        if not timed:
+            return None
+
+        if self.calibration_ms is None:
+            self.calibration_ms = round(calibrate(), 4)
+
+        samples = []
+        for _ in range(PERF_RUNS):
+            args = setup()
+            start = time.perf_counter()
+            response = call(*args)
+            samples.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == expected_status, response.content
+
+        result = {
+            "queries": queries,
+            "p50_ms": round(statistics.median(samples), 3),
+            "p95_ms": round(percentile(samples, 0.95), 3),
+            "max_ms": round(max(samples), 3),
+        }
+        self.results[name] = result
+
+        baseline = self.baseline.get(name)
+        if UPDATE_BASELINE or not baseline:
+            return result
+
+        expected = baseline["p50_ms"] * self.scale()
+        allowed = max(expected * (1 + PERF_BUDGET), expected + MIN_HEADROOM_MS)
+        assert result["p50_ms"] <= allowed, (
+            f"{name}: median latency {result['p50_ms']} ms exceeds the budget of {allowed:.3f} ms "
+            f"(baseline {expected:.3f} ms on this machine + {PERF_BUDGET:.0%}, at least +{MIN_HEADROOM_MS} ms)"
+        )
+        return result
+
+    def finish(self):
+        if not UPDATE_BASELINE or not self.results:
+            return
+        baseline = dict(self.baseline)
+        if ADD_MISSING_ONLY and baseline.get("calibration_ms"):
+            # Keep the recorded entries and express the new ones in the baseline machine's terms
+            scale = self.scale()
+            for name, result in self.results.items():
+                if name not in baseline:
+                    baseline[name] = {
+                        key: value if key == "queries" else round(value / scale, 3)
+                        for key, value in result.items()
+                    }
+        else:
+            baseline.update(self.results)
+            baseline["calibration_ms"] = self.calibration_ms
+        save_baseline(baseline)
+
+    def report_lines(self):
+        lines = [f"calibration: {self.calibration_ms} ms (baseline scale x{self.scale():.2f})"]
+        lines.append(f"{'endpoint':<28}{'queries':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'base p50':>10}")
+        for name, result in sorted(self.results.items()):
+            base = self.baseline.get(name, {}).get("p50_ms")
+            base = round(base * self.scale(), 3) if base else "-"
+            lines.append(
+                f"{name:<28}{result['queries']:>8}{result['p50_ms']:>10}{result['p95_ms']:>10}"
+                f"{result['max_ms']:>10}{base:>10}"
+            )
+        return lines
@@ -0,0 +1,44 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..models import UserDetails
+
+pytestmark = pytest.mark.django_db
+
+
+def test_session_changelist_does_not_scan_for_filter_choices(admin_client, make_session):
+    make_session()
+    make_session(status="approved")
+
+    with CaptureQueriesContext(connection) as captured:
+        response = admin_client.get("/admin/kyc/sessiondetails/", {"status": "approved"})
+
+    assert response.status_code == 200
+    assert [session.status for session in response.context["cl"].result_list] == ["approved"]
+    assert not [query["sql"] for query in captured.captured_queries if "DISTINCT" in query["sql"]]
+
+
+def test_session_search_matches_each_table(admin_client, make_session):
+    first, second, third = make_session(), make_session(), make_session()
+    UserDetails.objects.filter(pk=second.personal_data_id).update(last_name="Zapata")
+
+    def search(term):
+        response = admin_client.get("/admin/kyc/sessiondetails/", {"q": term})
+        return {session.pk for session in response.context["cl"].result_list}
+
+    assert search(first.session_id) == {first.pk}
+    assert search("zapata") == {second.pk}
+    assert search(f"doc{third.personal_data.document_id[3:]}") == {third.pk}
+    assert search(f"zapata {second.session_id}") == {second.pk}
+    assert search("nobody") == set()
+
+
+def test_session_search_unions_per_table_lookups(admin_client, make_session):
+    make_session()
+
+    with CaptureQueriesContext(connection) as captured:
+        admin_client.get("/admin/kyc/sessiondetails/", {"q": "john"})
+
+    searches = [query["sql"] for query in captured.captured_queries if "UNION" in query["sql"]]
+    assert searches
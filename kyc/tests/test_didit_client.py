@@ -0,0 +1,189 @@
+import io
+import itertools
+import json
+import time
+from unittest import mock
+
+import pytest
+from django.test import override_settings
+
+from ..models import DiditQuotaMetric, DiditRateLimitBucket, UserDetails
+from ..utils.json_stream import PayloadTooLarge
+from ..utils.webhook_events import DECISION_FIELDS
+from ..utils import didit_client
+from ..utils.didit_client import (
+    PRIORITY_BATCH, PRIORITY_INTERACTIVE, PRIORITY_WEBHOOK, DiditQuotaTimeout, acquire_quota, get_quota_metrics,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@override_settings(DIDIT_RATE_LIMIT_PER_MINUTE=6, DIDIT_RATE_LIMIT_BURST=10)
+def test_priorities_keep_reserved_capacity():
+    # Batch jobs leave half the bucket, webhook follow-ups a fifth
+    for _ in range(5):
+        acquire_quota(PRIORITY_BATCH, deadline=0)
+    with pytest.raises(DiditQuotaTimeout):
+        acquire_quota(PRIORITY_BATCH, deadline=0)
+
+    for _ in range(3):
+        acquire_quota(PRIORITY_WEBHOOK, deadline=0)
+    with pytest.raises(DiditQuotaTimeout):
+        acquire_quota(PRIORITY_WEBHOOK, deadline=0)
+
+    for _ in range(2):
+        acquire_quota(PRIORITY_INTERACTIVE, deadline=0)
+    with pytest.raises(DiditQuotaTimeout):
+        acquire_quota(PRIORITY_INTERACTIVE, deadline=0)
+
+    assert DiditRateLimitBucket.objects.get().tokens < 1
+    assert get_quota_metrics()["batch"]["timeouts"] >= 1
+
+
+@override_settings(DIDIT_RATE_LIMIT_PER_MINUTE=600, DIDIT_RATE_LIMIT_BURST=1)
+def test_waits_in_queue_until_refill():
+    acquire_quota(PRIORITY_INTERACTIVE, deadline=0)
+    # One token every 0.1 s
+    waited = acquire_quota(PRIORITY_INTERACTIVE, deadline=1)
+    assert 0.05 < waited < 1
+    assert get_quota_metrics()["interactive"]["max_wait_seconds"] >= waited
+
+
+def test_client_calls_acquire_quota():
+    with mock.patch.object(didit_client, "acquire_quota") as acquire, \
+            mock.patch.object(didit_client, "get_client_token", return_value="token"), \
+            mock.patch.object(didit_client.requests, "get") as get:
+        get.return_value.json.return_value = {"status": "Approved"}
+        assert didit_client.retrieve_session("abc", priority=PRIORITY_WEBHOOK) == {"status": "Approved"}
+    acquire.assert_called_once_with(PRIORITY_WEBHOOK, None)
+
+
+def test_lost_compare_and_set_backs_off_until_deadline():
+    with mock.patch.object(didit_client, "_try_take_token", return_value=None) as take:
+        start = time.monotonic()
+        with pytest.raises(DiditQuotaTimeout):
+            acquire_quota(PRIORITY_INTERACTIVE, deadline=0.2)
+    assert time.monotonic() - start < 0.5
+    # Each retry sleeps up to CAS_RETRY_DELAY instead of spinning on the bucket row
+    assert take.call_count < 50
+
+
+def test_create_session_quota_queries(client, django_assert_num_queries):
+    counter = itertools.count()
+
+    def fake_post(url, **kwargs):
+        index = next(counter)
+        return mock.Mock(
+            status_code=200, text="{}",
+            json=mock.Mock(return_value={"access_token": "token", "session_id": f"didit-{index}", "url": "u"}),
+        )
+
+    def post():
+        return client.post(
+            "/kyc/api/kyc/",
+            {"first_name": "John", "last_name": "Doe", "document_id": "1234567890"},
+            content_type="application/json",
+        )
+
+    with mock.patch.object(didit_client.requests, "post", side_effect=fake_post):
+        assert post().status_code == 201  # creates the bucket and stats rows
+        # The 6 queries of the view, reading and compare-and-set updating the quota bucket,
+        # and updating the shared wait-time metrics
+        with django_assert_num_queries(9):
+            assert post().status_code == 201
+
+
+def test_create_session_quota_timeout_is_retryable(client):
+    timeout = DiditQuotaTimeout("busy", retry_after=2.5)
+    with mock.patch.object(didit_client, "acquire_quota", side_effect=timeout):
+        response = client.post(
+            "/kyc/api/kyc/",
+            {"first_name": "John", "last_name": "Doe", "document_id": "1234567890"},
+            content_type="application/json",
+        )
+
+    assert response.status_code == 503
+    assert response["Retry-After"] == "3"
+    assert not UserDetails.objects.exists()
+
+
+class StreamedDecision:
+    """requests.Response stand-in that only allows reading the body as a stream."""
+
+    def __init__(self, body):
+        self.status_code = 200
+        self.raw = io.BytesIO(body)
+        self.closed = False
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def __getattr__(self, name):
+        # .text, .content and .json() would load the whole decision in memory
+        raise AssertionError(f"response.{name} used")
+
+
+def _decision(image_mb=2):
+    return json.dumps({
+        "status": "Approved",
+        "kyc": {"document_number": "X1234567", "front_image": "A" * (image_mb * 1024 * 1024)},
+    }).encode()
+
+
+def test_retrieve_decision_fields_streams_the_decision():
+    response = StreamedDecision(_decision())
+    with mock.patch.object(didit_client, "acquire_quota"), \
+            mock.patch.object(didit_client, "get_client_token", return_value="token"), \
+            mock.patch.object(didit_client.requests, "get", return_value=response) as get:
+        data = didit_client.retrieve_decision_fields("abc", DECISION_FIELDS, max_bytes=10 * 1024 * 1024)
+
+    assert data == {"status": "Approved", "kyc": {"document_number": "X1234567"}}
+    assert get.call_args.kwargs["stream"] is True
+    assert response.closed
+
+    with mock.patch.object(didit_client, "acquire_quota"), \
+            mock.patch.object(didit_client, "get_client_token", return_value="token"), \
+            mock.patch.object(didit_client.requests, "get", return_value=StreamedDecision(_decision())):
+        with pytest.raises(PayloadTooLarge):
+            didit_client.retrieve_decision_fields("abc", DECISION_FIELDS, max_bytes=1024 * 1024)
+
+
+def test_completed_webhook_streams_the_decision(client, make_session):
+    session = make_session()
+    response = StreamedDecision(_decision())
+    with mock.patch.object(didit_client, "get_client_token", return_value="token"), \
+            mock.patch.object(didit_client.requests, "get", return_value=response) as get:
+        webhook = client.post(
+            "/kyc/api/webhook/",
+            json.dumps({"session_id": session.session_id, "status": "Completed"}),
+            content_type="application/json",
+        )
+
+    assert webhook.status_code == 200
+    get.assert_called_once()
+    assert response.raw.tell() == len(response.raw.getvalue())
+
+
+def test_quota_metrics_are_shared_between_workers():
+    # Row written by another worker process
+    DiditQuotaMetric.objects.create(priority="webhook", requests=3, waited=1, total_wait_seconds=1.5,
+                                    max_wait_seconds=1.5)
+    acquire_quota(PRIORITY_WEBHOOK, deadline=0)
+
+    metrics = get_quota_metrics()["webhook"]
+    assert metrics["requests"] == 4
+    assert metrics["max_wait_seconds"] == 1.5
+    assert metrics["avg_wait_seconds"] == pytest.approx(1.5 / 4, rel=0.01)
+
+
+def test_webhook_decision_lookup_does_not_wait_for_long(client, didit_mock, make_session):
+    session = make_session()
+    client.post(
+        "/kyc/api/webhook/",
+        json.dumps({"session_id": session.session_id, "status": "Completed"}),
+        content_type="application/json",
+    )
+    assert didit_mock.retrieve_decision_fields.call_args.kwargs["deadline"] <= 5
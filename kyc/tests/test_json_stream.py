@@ -0,0 +1,76 @@
+import base64
+import io
+import json
+
+import pytest
+from django.test import override_settings
+
+from ..models import UserDetails
+from ..utils.json_stream import ANY, PayloadTooLarge, StreamingJSONError, extract_fields
+from ..utils.webhook_events import WEBHOOK_FIELDS
+
+IMAGE = base64.b64encode(b"\x00" * 300_000).decode()
+
+
+def _payload(**kwargs):
+    payload = {
+        "session_id": "abc",
+        "status": "Approved",
+        "created_at": 1741019400,
+        "vendor_data": {"selfie": IMAGE},
+        "decision": {
+            "kyc": {
+                "document_number": "X1234567",
+                "last_name": "Díaz \"Jr\"",
+                "front_image": IMAGE,
+                "address": {"city": "Bogotá"},
+            },
+            "face": {"kyc": {"document_number": "ignored"}},
+        },
+    }
+    payload.update(kwargs)
+    return json.dumps(payload).encode()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_extracts_only_requested_fields(chunk_size):
+    data = extract_fields(io.BytesIO(_payload()), WEBHOOK_FIELDS, chunk_size=chunk_size)
+    assert data == {
+        "session_id": "abc",
+        "status": "Approved",
+        "created_at": 1741019400,
+        "decision": {"kyc": {"document_number": "X1234567", "last_name": "Díaz \"Jr\""}},
+    }
+
+
+def test_wildcards_and_arrays():
+    raw = b'{"items": [{"id": 1}, {"id": 2, "x": [true, null]}], "id": null}'
+    assert extract_fields(io.BytesIO(raw), [("items", ANY, "id"), ("id",)]) == {
+        "items": {0: {"id": 1}, 1: {"id": 2}},
+        "id": None,
+    }
+
+
+def test_size_cap_and_invalid_documents():
+    with pytest.raises(PayloadTooLarge):
+        extract_fields(io.BytesIO(_payload()), WEBHOOK_FIELDS, max_bytes=100_000, chunk_size=4096)
+    for raw in (b'{"status": "Approved"', b'{"status" "x"}', b'[1,]', b'{"a": tru}', b'{} {}', b""):
+        with pytest.raises(StreamingJSONError):
+            extract_fields(io.BytesIO(raw), WEBHOOK_FIELDS)
+
+
+@pytest.mark.django_db
+def test_webhook_with_embedded_images(client, didit_mock, make_session):
+    session = make_session()
+    body = _payload(session_id=session.session_id)
+
+    with override_settings(KYC_WEBHOOK_MAX_BYTES=len(body) - 1):
+        response = client.post("/kyc/api/webhook/", body, content_type="application/json")
+    assert response.status_code == 413
+
+    response = client.post("/kyc/api/webhook/", b'{"status": ', content_type="application/json")
+    assert response.status_code == 400
+
+    response = client.post("/kyc/api/webhook/", body, content_type="application/json")
+    assert response.status_code == 200
+    assert UserDetails.objects.get(pk=session.personal_data_id).document_id == "X1234567"
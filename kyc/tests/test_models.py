@@ -0,0 +1,48 @@
+import pytest
+from django.db import IntegrityError
+from django.utils import timezone
+from ..models import UserDetails, SessionDetails
+
+@pytest.mark.django_db
+class TestSessionDetails:
+
+    def _user(self, **kwargs):
+        data = {"first_name": "John", "last_name": "Doe", "document_id": "1234567890"}
+        data.update(kwargs)
+        return UserDetails.objects.create(**data)
+
+    def test_create_session_details(self):
+        """Test creating a session linked to its personal data."""
+        personal_data = self._user()
+        session = SessionDetails.objects.create(personal_data=personal_data, session_id="test-session-123")
+        assert session.id is not None
+        assert session.session_id == "test-session-123"
+        assert personal_data.session_details == session
+
+    def test_default_values(self):
+        """Test default status is 'pending' and document type 'unknown'."""
+        personal_data = self._user()
+        session = SessionDetails.objects.create(personal_data=personal_data)
+        assert session.status == "pending"
+        assert personal_data.document_type == "unknown"
+
+    def test_string_representation(self):
+        """Test the string representation of both models."""
+        personal_data = self._user(first_name="Alice", last_name="Johnson", document_id="ABCD1234")
+        session = SessionDetails.objects.create(personal_data=personal_data, session_id="abc")
+        assert str(personal_data) == "Alice Johnson - ABCD1234"
+        assert str(session) == "Session abc - pending"
+
+    def test_session_id_unique(self):
+        """Test session_id uniqueness constraint."""
+        SessionDetails.objects.create(personal_data=self._user(), session_id="unique-session-id")
+        with pytest.raises(IntegrityError):
+            SessionDetails.objects.create(personal_data=self._user(document_id="2"), session_id="unique-session-id")
+
+    def test_created_updated_timestamps(self):
+        """Test that timestamps are set correctly."""
+        before_creation = timezone.now()
+        session = SessionDetails.objects.create(personal_data=self._user())
+        after_creation = timezone.now()
+        assert before_creation <= session.created_at <= after_creation
+        assert before_creation <= session.updated_at <= after_creation
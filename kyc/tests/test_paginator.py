@@ -0,0 +1,49 @@
+from unittest import mock
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..models import SessionDetails
+from ..utils import paginator
+from ..utils.paginator import EstimatedCountPaginator
+
+pytestmark = pytest.mark.django_db
+
+
+def _counts(queries):
+    return [query["sql"] for query in queries if "COUNT(" in query["sql"]]
+
+
+def test_exact_count_below_threshold(make_session):
+    for _ in range(3):
+        make_session()
+
+    assert EstimatedCountPaginator(SessionDetails.objects.order_by("-created_at"), 10).count == 3
+    assert EstimatedCountPaginator(SessionDetails.objects.filter(status="pending").order_by("-created_at"), 10).count == 3
+
+
+def test_estimate_above_threshold(make_session):
+    make_session()
+
+    with mock.patch.object(EstimatedCountPaginator, "_table_estimate", return_value=50_000), \
+            CaptureQueriesContext(connection) as captured:
+        assert EstimatedCountPaginator(SessionDetails.objects.order_by("-created_at"), 10).count == 50_000
+    assert not _counts(captured.captured_queries)
+
+    # Filtered querysets use the EXPLAIN row estimate
+    with mock.patch.object(paginator, "EXACT_COUNT_THRESHOLD", 0), \
+            CaptureQueriesContext(connection) as captured:
+        estimate = EstimatedCountPaginator(SessionDetails.objects.filter(status="pending").order_by("-created_at"), 10).count
+    assert isinstance(estimate, int) and estimate >= 1
+    assert not _counts(captured.captured_queries)
+
+
+def test_exact_count_on_other_backends(make_session):
+    make_session()
+    other = mock.MagicMock(vendor="sqlite")
+
+    with mock.patch.object(paginator, "connections", {"default": other}), \
+            mock.patch.object(EstimatedCountPaginator, "_table_estimate") as estimate:
+        assert EstimatedCountPaginator(SessionDetails.objects.order_by("-created_at"), 10).count == 1
+    estimate.assert_not_called()
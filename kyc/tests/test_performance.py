@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+
+def test_create_session_performance(client, didit_mock, perf):
+    """POST /kyc/api/kyc/ stores the user and the session and calls Didit once."""
+    def call():
+        return client.post(
+            "/kyc/api/kyc/",
+            {"first_name": "John", "last_name": "Doe", "document_id": "1234567890"},
+            content_type="application/json",
+        )
+
+    perf.measure("didit_create_session", call, queries=6, expected_status=201)
+    assert didit_mock.create_session.called
+
+
+def test_webhook_performance(client, didit_mock, make_session, perf):
+    """POST /kyc/api/webhook/ moves a pending session to a final status."""
+    def setup():
+        return (make_session().session_id,)
+
+    def call(session_id):
+        payload = {
+            "session_id": session_id,
+            "status": "Approved",
+            "decision": {
+                "kyc": {
+                    "document_number": "X1234567",
+                    "document_type": "Passport",
+                    "date_of_birth": "1990-01-01",
+                    "last_name": "Doe",
+                    "issuing_state_name": "Colombia",
+                }
+            },
+        }
+        return client.post("/kyc/api/webhook/", json.dumps(payload), content_type="application/json")
+
+    perf.measure("didit_webhook", call, queries=8, setup=setup)
+
+
+def test_retrieve_session_performance(client, didit_mock, perf):
+    """GET /kyc/api/retrieve/<session_id>/ only proxies Didit."""
+    def call():
+        return client.get("/kyc/api/retrieve/mock-session/")
+
+    perf.measure("didit_retrieve_session", call, queries=0)
+
+
+def test_update_status_performance(client, didit_mock, perf):
+    """PATCH /kyc/api/update-status/<session_id>/ only proxies Didit."""
+    def call():
+        return client.patch(
+            "/kyc/api/update-status/mock-session/",
+            {"status": "Approved"},
+            content_type="application/json",
+        )
+
+    perf.measure("didit_update_status", call, queries=0)
+
+
+def test_session_status_performance(client, make_session, perf):
+    """GET /kyc/api/status/<session_id>/ reads the status with one indexed query."""
+    def setup():
+        return (make_session().session_id,)
+
+    def call(session_id):
+        return client.get(f"/kyc/api/status/{session_id}/")
+
+    perf.measure("session_status", call, queries=1, setup=setup)
+
+
+def test_session_status_not_modified_performance(client, make_session, perf):
+    """A poll with a matching If-None-Match is answered from the cache."""
+    def setup():
+        session_id = make_session().session_id
+        etag = client.get(f"/kyc/api/status/{session_id}/")["ETag"]
+        return session_id, etag
+
+    def call(session_id, etag):
+        return client.get(f"/kyc/api/status/{session_id}/", HTTP_IF_NONE_MATCH=etag)
+
+    perf.measure("session_status_not_modified", call, queries=0, setup=setup, expected_status=304)
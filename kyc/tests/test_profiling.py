@@ -0,0 +1,65 @@
+import marshal
+import zlib
+from unittest import mock
+
+import pytest
+from django.test import override_settings
+
+from ..models import RequestProfile
+from ..utils import didit_client
+
+pytestmark = pytest.mark.django_db
+
+PAYLOAD = {"first_name": "John", "last_name": "Doe", "document_id": "1234567890"}
+
+
+@pytest.fixture
+def didit_http():
+    """Mocks the HTTP layer of the Didit client so outbound calls are recorded."""
+    token = mock.Mock(status_code=200, text="{}")
+    token.json.return_value = {"access_token": "token"}
+    session = mock.Mock(status_code=201, text="{}")
+    session.json.return_value = {"session_id": "profiled-session", "url": "https://verify.didit.me/x"}
+    with mock.patch.object(didit_client, "acquire_quota"), \
+            mock.patch.object(didit_client.requests, "post", side_effect=[token, session]):
+        yield
+
+
+@override_settings(KYC_PROFILING_TOKEN="secret")
+def test_profiles_request_with_authorized_header(client, didit_http):
+    response = client.post("/kyc/api/kyc/", PAYLOAD, content_type="application/json", HTTP_X_KYC_PROFILE="secret")
+
+    assert response.status_code == 201
+    profile = RequestProfile.objects.get(pk=response["X-KYC-Profile-Id"])
+    assert (profile.method, profile.path, profile.status_code, profile.trigger) == (
+        "POST", "/kyc/api/kyc/", 201, "header"
+    )
+    assert profile.query_count == len(profile.report["queries"]) > 0
+    assert [call["url"] for call in profile.report["outbound"]] == [
+        didit_client.AUTH_URL, didit_client.CREATE_SESSION_URL
+    ]
+    assert profile.report["functions"]
+    assert marshal.loads(zlib.decompress(profile.pstats))
+
+
+@override_settings(KYC_PROFILING_TOKEN="secret")
+def test_not_triggered_without_valid_header(client, didit_mock):
+    for headers in ({}, {"HTTP_X_KYC_PROFILE": "wrong"}):
+        response = client.post("/kyc/api/kyc/", PAYLOAD, content_type="application/json", **headers)
+        assert response.status_code == 201
+        assert not response.has_header("X-KYC-Profile-Id")
+    assert not RequestProfile.objects.exists()
+
+
+@override_settings(KYC_PROFILING_SAMPLE_RATE=1.0)
+def test_sampling_and_admin_views(client, admin_client, didit_mock):
+    response = client.get("/kyc/api/retrieve/abc/")
+    profile = RequestProfile.objects.get(pk=response["X-KYC-Profile-Id"])
+    assert profile.trigger == "sample"
+
+    with override_settings(KYC_PROFILING_SAMPLE_RATE=0):
+        assert admin_client.get(f"/admin/kyc/requestprofile/{profile.pk}/change/").status_code == 200
+        download = admin_client.get(f"/admin/kyc/requestprofile/{profile.pk}/download/prof/")
+        assert download.status_code == 200
+        assert marshal.loads(download.content)
+        assert admin_client.get(f"/admin/kyc/requestprofile/{profile.pk}/download/json/").json() == profile.report
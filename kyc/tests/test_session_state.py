@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from ..models import SessionDetails
+from ..utils.session_state import APPLIED, NOT_FOUND, STALE, apply_transition, can_transition, event_version
+
+
+def test_can_transition():
+    assert can_transition("pending", "in progress")
+    assert can_transition("pending", "approved")
+    assert can_transition("in review", "declined")
+    assert not can_transition("approved", "pending")
+    assert can_transition("declined", "approved")
+    assert not can_transition("approved", "approved")
+    assert not can_transition("in review", "in progress")
+    assert not can_transition("pending", "pending")
+
+
+def test_event_version():
+    assert event_version({"timestamp": "2025-03-03T16:30:00Z"}) == 1741019400 * 1_000_000
+    assert event_version({"created_at": 1741019400}) == 1741019400 * 1_000_000
+    assert event_version({"timestamp": "1741019400.5"}) == 1741019400500000
+    assert event_version({"timestamp": "not a date"}) > 1741019400 * 1_000_000
+
+
+@pytest.mark.django_db
+def test_apply_transition(make_session):
+    session = make_session()
+
+    assert apply_transition(session.session_id, "in progress", 10)[0] == APPLIED
+    assert apply_transition(session.session_id, "approved", 5)[0] == STALE
+    assert apply_transition(session.session_id, "approved", 20)[0] == APPLIED
+    assert apply_transition(session.session_id, "in review", 30)[0] == STALE
+    assert apply_transition("missing", "approved", 40) == (NOT_FOUND, None)
+
+    session.refresh_from_db()
+    assert (session.status, session.version) == ("approved", 20)
+
+
+@pytest.mark.django_db
+def test_apply_transition_same_second_events(make_session):
+    session = make_session()
+
+    # Didit timestamps are whole seconds: a forward move may tie with the previous event
+    assert apply_transition(session.session_id, "in progress", 10)[0] == APPLIED
+    assert apply_transition(session.session_id, "approved", 10)[0] == APPLIED
+    assert apply_transition(session.session_id, "in progress", 10)[0] == STALE
+    # Replacing a final decision needs a strictly newer event
+    assert apply_transition(session.session_id, "declined", 10)[0] == STALE
+
+    session.refresh_from_db()
+    assert session.status == "approved"
+
+
+@pytest.mark.django_db
+def test_newer_decision_replaces_final_status(client, didit_mock, make_session):
+    session = make_session()
+
+    def post(didit_status, created_at):
+        payload = {"session_id": session.session_id, "status": didit_status, "created_at": created_at}
+        return client.post("/kyc/api/webhook/", json.dumps(payload), content_type="application/json")
+
+    assert post("Declined", 100).json()["message"] == "Webhook processed"
+    # e.g. approved after a manual review
+    assert post("Approved", 200).json()["message"] == "Webhook processed"
+    assert post("Declined", 150).json()["message"] == "Stale event ignored"
+    assert SessionDetails.objects.get(pk=session.pk).status == "approved"
+
+
+@pytest.mark.django_db
+def test_webhook_drops_out_of_order_events(client, didit_mock, make_session):
+    session = make_session()
+
+    def post(didit_status, timestamp):
+        payload = {"session_id": session.session_id, "status": didit_status, "timestamp": timestamp}
+        return client.post("/kyc/api/webhook/", json.dumps(payload), content_type="application/json")
+
+    assert post("Approved", "2025-03-03T16:30:00Z").json()["message"] == "Webhook processed"
+    response = post("Pending", "2025-03-03T16:29:00Z")
+    assert response.status_code == 200
+    assert response.json() == {"message": "Stale event ignored", "status": "approved", "session_id": session.session_id}
+    assert SessionDetails.objects.get(pk=session.pk).status == "approved"
+
+    payload = {"session_id": "missing", "status": "Approved"}
+    assert client.post("/kyc/api/webhook/", json.dumps(payload), content_type="application/json").status_code == 404
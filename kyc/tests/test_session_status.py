@@ -0,0 +1,81 @@
+import json
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from ..utils.status_cache import get_session_status, make_entry
+
+pytestmark = pytest.mark.django_db
+
+
+def test_status_returns_etag(client, make_session):
+    session = make_session()
+
+    response = client.get(f"/kyc/api/status/{session.session_id}/")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+    assert response["ETag"].startswith('"')
+    assert response["Cache-Control"] == "no-cache"
+
+
+def test_matching_etag_is_not_modified_without_queries(client, make_session, django_assert_num_queries):
+    session = make_session()
+    etag = client.get(f"/kyc/api/status/{session.session_id}/")["ETag"]
+
+    with django_assert_num_queries(0):
+        response = client.get(f"/kyc/api/status/{session.session_id}/", HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+
+
+def test_webhook_updates_cached_status(client, didit_mock, make_session, django_capture_on_commit_callbacks):
+    session = make_session()
+    etag = client.get(f"/kyc/api/status/{session.session_id}/")["ETag"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post(
+            "/kyc/api/webhook/",
+            json.dumps({"session_id": session.session_id, "status": "In Progress"}),
+            content_type="application/json",
+        )
+    response = client.get(f"/kyc/api/status/{session.session_id}/", HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "in progress"
+    assert response["ETag"] != etag
+
+
+def test_unknown_session_is_not_found(client, db):
+    assert client.get("/kyc/api/status/missing/").status_code == 404
+
+
+def test_cache_fill_does_not_replace_newer_entry(make_session):
+    session = make_session()
+    newer = make_entry(session.session_id, "approved", timezone.now())
+    real_get = cache.get
+
+    def get_then_race(key, *args):
+        # Cache miss, then a webhook writes its new status through before our fill
+        value = real_get(key, *args)
+        cache.set(key, newer)
+        return value
+
+    with mock.patch.object(cache, "get", side_effect=get_then_race):
+        assert get_session_status(session.session_id)["status"] == "pending"
+
+    assert get_session_status(session.session_id) == newer
+
+
+def test_admin_delete_invalidates_cached_status(admin_client, make_session, django_capture_on_commit_callbacks):
+    session = make_session()
+    assert get_session_status(session.session_id) is not None
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = admin_client.post(f"/admin/kyc/sessiondetails/{session.pk}/delete/", {"post": "yes"})
+
+    assert response.status_code == 302
+    assert get_session_status(session.session_id) is None
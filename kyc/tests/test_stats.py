@@ -0,0 +1,73 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+
+from ..models import SessionDetails, SessionStatusBucket
+from ..utils import stats
+from ..utils.stats import get_funnel_stats, median_from_histogram, rebuild_stats, record_transition
+
+
+def test_median_from_histogram():
+    assert median_from_histogram({}) is None
+    assert median_from_histogram({60: 2, 300: 2}) == 60
+    assert median_from_histogram({60: 0, 300: 4}) == 180
+
+
+@pytest.mark.django_db
+def test_counters_follow_transitions():
+    record_transition(None, "pending")
+    record_transition(None, "pending")
+    record_transition("pending", "approved", created_at=timezone.now() - timedelta(seconds=30))
+
+    stats = get_funnel_stats()
+    assert stats["status_counts"] == {"pending": 1, "approved": 1}
+    assert stats["completed"] == 1
+    assert stats["median_completion_seconds"] == 30
+
+
+@pytest.mark.django_db
+def test_rebuild_matches_live_counters(make_session):
+    make_session()
+    make_session(status="approved")
+    # Sessions never confirmed by Didit have no session_id and are not counted
+    SessionDetails.objects.filter(pk=make_session().pk).update(session_id=None)
+
+    assert rebuild_stats() == 2
+    assert get_funnel_stats()["status_counts"] == {"pending": 1, "approved": 1}
+
+
+@pytest.mark.django_db
+def test_sharded_counters_are_summed():
+    with mock.patch("kyc.utils.stats._shard", side_effect=[0, 1, 2]):
+        record_transition(None, "pending")
+        record_transition(None, "pending")
+        record_transition("pending", "approved", created_at=timezone.now())
+
+    assert SessionStatusBucket.objects.filter(status="pending").count() == 3
+    stats = get_funnel_stats()
+    assert stats["status_counts"] == {"pending": 1, "approved": 1}
+    assert [row["count"] for row in stats["hourly"]] == [1, 2]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rebuild_keeps_transitions_committed_during_the_scan(make_session):
+    pending, moving = make_session(), make_session()
+    real_lock = stats._lock_counter_tables
+
+    def transition_then_lock():
+        # A webhook commits after the scan's snapshot, before the counters are replaced
+        SessionDetails.objects.filter(pk=moving.pk).update(status="approved")
+        record_transition("pending", "approved", created_at=moving.created_at)
+        real_lock()
+
+    with mock.patch.object(stats, "_lock_counter_tables", side_effect=transition_then_lock):
+        assert rebuild_stats() == 2
+
+    stats_now = get_funnel_stats()
+    assert stats_now["status_counts"] == {"pending": 1, "approved": 1}
+    assert stats_now["completed"] == 1
+    # A second rebuild sees the same state
+    rebuild_stats()
+    assert get_funnel_stats()["status_counts"] == {"pending": 1, "approved": 1}
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ..models import SessionDetails
+from ..utils.stats import get_funnel_stats
+from ..utils.webhook_events import apply_webhook_events
+
+pytestmark = pytest.mark.django_db
+
+
+def _event(session_id, didit_status="Approved", **kyc):
+    return {"session_id": session_id, "status": didit_status, "decision": {"kyc": kyc}}
+
+
+def test_apply_webhook_events_outcomes(make_session):
+    first, second = make_session(), make_session()
+    results = apply_webhook_events([
+        _event(first.session_id, document_number="X1", date_of_birth="1990-01-01"),
+        _event(second.session_id, "pending"),
+        _event("missing"),
+        {"status": "Approved"},
+        "not an event",
+        {"session_id": [first.session_id], "status": "Approved"},
+        {"session_id": second.session_id, "status": 5},
+        {"session_id": second.session_id, "status": "Approved", "decision": [{"kyc": {}}]},
+        {"session_id": second.session_id, "status": "Approved", "decision": {"kyc": "X1"}},
+        _event(second.session_id, "A" * 51),
+        _event(second.session_id, document_number="9" * 101),
+        _event(second.session_id, document_type="T" * 51),
+        _event(second.session_id, date_of_birth="not a date"),
+    ])
+
+    assert [result["outcome"] for result in results] == [
+        "updated", "stale", "not_found", "invalid", "invalid", "invalid", "invalid", "invalid", "invalid",
+        "invalid", "invalid", "invalid", "invalid",
+    ]
+    first.refresh_from_db()
+    first.personal_data.refresh_from_db()
+    assert first.status == "approved"
+    assert first.personal_data.document_id == "X1"
+    assert str(first.personal_data.date_of_birth) == "1990-01-01"
+    assert get_funnel_stats()["completed"] == 1
+
+
+def test_apply_webhook_events_query_count_is_constant(make_session):
+    def queries_for(count):
+        events = [_event(make_session().session_id, document_number=f"N{i}") for i in range(count)]
+        with CaptureQueriesContext(connection) as captured:
+            apply_webhook_events(events)
+        return len(captured.captured_queries)
+
+    queries_for(1)  # creates the stats counter rows for this hour
+    assert queries_for(2) == queries_for(20)
+
+
+def test_bulk_endpoint_requires_staff(client, make_session):
+    session = make_session()
+    user = User.objects.create_user("ops", password="secret")
+    url = "/kyc/api/webhook/bulk/"
+    payload = json.dumps({"events": [_event(session.session_id)]})
+
+    assert client.post(url, payload, content_type="application/json").status_code == 401
+
+    token = str(RefreshToken.for_user(user).access_token)
+    response = client.post(url, payload, content_type="application/json", HTTP_AUTHORIZATION=f"Bearer {token}")
+    assert response.status_code == 403
+
+    user.is_staff = True
+    user.save()
+    response = client.post(url, payload, content_type="application/json", HTTP_AUTHORIZATION=f"Bearer {token}")
+    assert response.status_code == 200
+    assert response.json()["updated"] == 1
+    assert SessionDetails.objects.get(pk=session.pk).status == "approved"
+
+
+def test_import_command(tmp_path, make_session):
+    session = make_session()
+    path = tmp_path / "events.jsonl"
+    path.write_text("\n".join(json.dumps(event) for event in [_event(session.session_id), _event("missing")]))
+
+    call_command("import_webhook_events", str(path), batch_size=1)
+
+    assert SessionDetails.objects.get(pk=session.pk).status == "approved"
+
+
+def test_webhook_rejects_values_too_long_for_the_database(client, make_session):
+    session = make_session()
+    payload = _event(session.session_id, document_number="9" * 101)
+
+    response = client.post("/kyc/api/webhook/", json.dumps(payload), content_type="application/json")
+
+    assert response.status_code == 400
+    assert SessionDetails.objects.get(pk=session.pk).status == "pending"
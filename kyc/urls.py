@@ -3,8 +3,11 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .views import (
     DiditKYCAPIView,
     didit_webhook,
+    BulkWebhookImportAPIView,
     RetrieveSessionAPIView,
+    session_status,
     UpdateStatusAPIView,
+    KYCStatsAPIView,
     kyc_test,
 )
 
@@ -18,7 +21,10 @@ urlpatterns = [
     
     path("api/kyc/", DiditKYCAPIView.as_view(), name="didit_create_session"),
     path("api/webhook/", didit_webhook, name="didit_webhook"),
+    path("api/webhook/bulk/", BulkWebhookImportAPIView.as_view(), name="didit_webhook_bulk"),
     path("api/retrieve/<str:session_id>/", RetrieveSessionAPIView.as_view(), name="didit_retrieve_session"),
+    path("api/status/<str:session_id>/", session_status, name="kyc_session_status"),
     path("api/update-status/<str:session_id>/", UpdateStatusAPIView.as_view(), name="didit_update_status"),
+    path("api/stats/", KYCStatsAPIView.as_view(), name="kyc_stats"),
     path("test/", kyc_test, name="kyc_test"),
 ]
@@ -1,6 +1,16 @@
 import requests
 import base64
+import random
+import time
 from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from ..models import DiditRateLimitBucket, DiditQuotaMetric
+from .profiling import timed_request
+from .json_stream import extract_fields
 
 # Endpoint para obtener el token de acceso
 AUTH_URL = "https://apx.didit.me/auth/v2/token/"
@@ -12,6 +22,161 @@ CREATE_SESSION_URL = "https://verification.didit.me/v1/session/"
 # Se debe formatear usando el session_id
 RETRIEVE_DECISION_URL_TEMPLATE = "https://verification.didit.me/v1/session/{session_id}/decision/"
 
+# ---------------------------------------------------------------------------
+# Planificador de cuota compartido para las llamadas salientes a Didit.
+#
+# Todos los workers comparten un token bucket guardado en la base de datos
+# (DiditRateLimitBucket) y actualizado con UPDATEs condicionales, sin locks.
+# Las prioridades se implementan con reservas: una clase sólo puede tomar un
+# token si después quedan al menos RESERVES[prioridad] * capacidad tokens, así
+# los jobs batch nunca agotan la cuota que necesitan los registros de usuarios.
+# ---------------------------------------------------------------------------
+
+PRIORITY_INTERACTIVE = 0  # create_session de usuarios, consultas y updates manuales
+PRIORITY_WEBHOOK = 1      # retrieve_session disparado por un webhook
+PRIORITY_BATCH = 2        # backfills y jobs en segundo plano
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_WEBHOOK: "webhook",
+    PRIORITY_BATCH: "batch",
+}
+
+# Fracción de la capacidad que cada prioridad debe dejar libre
+RESERVES = {
+    PRIORITY_INTERACTIVE: 0.0,
+    PRIORITY_WEBHOOK: 0.2,
+    PRIORITY_BATCH: 0.5,
+}
+
+# Tiempo máximo (segundos) que cada prioridad espera en cola por un token
+DEFAULT_DEADLINES = {
+    PRIORITY_INTERACTIVE: 5,
+    PRIORITY_WEBHOOK: 30,
+    PRIORITY_BATCH: 300,
+}
+
+QUOTA_BUCKET_NAME = "didit-api"
+
+# Pausa máxima (segundos) antes de reintentar tras perder el compare-and-set
+CAS_RETRY_DELAY = 0.05
+
+class DiditQuotaTimeout(Exception):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        # Segundos estimados hasta que haya cuota, para el header Retry-After
+        self.retry_after = retry_after
+
+def _quota_settings():
+    rate_per_minute = getattr(settings, "DIDIT_RATE_LIMIT_PER_MINUTE", 60)
+    capacity = getattr(settings, "DIDIT_RATE_LIMIT_BURST", rate_per_minute)
+    return rate_per_minute / 60.0, float(capacity)
+
+def _try_take_token(priority):
+    """
+    Intenta tomar un token del bucket compartido. Devuelve 0 si lo consiguió,
+    o los segundos estimados hasta que haya un token para esta prioridad.
+    """
+    rate, capacity = _quota_settings()
+    bucket = DiditRateLimitBucket.objects.filter(name=QUOTA_BUCKET_NAME).values("tokens", "updated_at").first()
+    if bucket is None:
+        DiditRateLimitBucket.objects.get_or_create(
+            name=QUOTA_BUCKET_NAME, defaults={"tokens": capacity, "updated_at": timezone.now()}
+        )
+        return _try_take_token(priority)
+
+    now = timezone.now()
+    elapsed = max((now - bucket["updated_at"]).total_seconds(), 0.0)
+    available = min(capacity, bucket["tokens"] + elapsed * rate)
+    floor = capacity * RESERVES[priority]
+    if available - 1 < floor:
+        return (floor + 1 - available) / rate
+
+    # Compare-and-set: sólo gana si nadie más tocó el bucket desde la lectura
+    taken = DiditRateLimitBucket.objects.filter(
+        name=QUOTA_BUCKET_NAME, tokens=bucket["tokens"], updated_at=bucket["updated_at"]
+    ).update(tokens=available - 1, updated_at=now)
+    return 0 if taken else None
+
+def _record_wait(priority, waited, timed_out=False):
+    """Suma la espera a las métricas compartidas de la prioridad (tabla DiditQuotaMetric)."""
+    name = PRIORITY_NAMES[priority]
+    increments = {
+        "requests": F("requests") + 1,
+        "waited": F("waited") + (1 if waited > 0 else 0),
+        "timeouts": F("timeouts") + (1 if timed_out else 0),
+        "total_wait_seconds": F("total_wait_seconds") + waited,
+        "max_wait_seconds": Greatest(F("max_wait_seconds"), Value(waited)),
+    }
+    try:
+        if DiditQuotaMetric.objects.filter(priority=name).update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                DiditQuotaMetric.objects.create(
+                    priority=name, requests=1, waited=1 if waited > 0 else 0, timeouts=1 if timed_out else 0,
+                    total_wait_seconds=waited, max_wait_seconds=waited,
+                )
+        except IntegrityError:
+            # Otro worker creó la fila a la vez
+            DiditQuotaMetric.objects.filter(priority=name).update(**increments)
+    except DatabaseError as e:
+        # Las métricas nunca deben bloquear una llamada a Didit
+        print(f"⚠️ Error saving Didit quota metrics: {e}")
+
+def acquire_quota(priority=PRIORITY_INTERACTIVE, deadline=None):
+    """
+    Espera en cola hasta obtener un token para una llamada a Didit. ``deadline``
+    es el máximo de segundos a esperar (por defecto según la prioridad); si se
+    supera se lanza DiditQuotaTimeout. Devuelve los segundos esperados.
+    """
+    if deadline is None:
+        # DIDIT_QUOTA_DEADLINES permite cambiarlos por nombre, p. ej. {"batch": 600}
+        deadline = getattr(settings, "DIDIT_QUOTA_DEADLINES", {}).get(
+            PRIORITY_NAMES[priority], DEFAULT_DEADLINES[priority]
+        )
+    start = time.monotonic()
+    while True:
+        try:
+            wait = _try_take_token(priority)
+        except DatabaseError as e:
+            # Si el bucket no está disponible no bloqueamos las llamadas a Didit
+            print(f"⚠️ Didit quota bucket unavailable, skipping rate limit: {e}")
+            wait = 0
+        waited = time.monotonic() - start
+        if wait == 0:
+            _record_wait(priority, waited)
+            return waited
+        if wait is None:
+            # Otro worker tomó el token a la vez: reintentar tras una pausa corta
+            # con jitter para no martillar la fila del bucket
+            delay = random.uniform(0, CAS_RETRY_DELAY)
+        else:
+            # Jitter para que los workers en espera no despierten todos a la vez
+            delay = wait * random.uniform(1.0, 1.2)
+        remaining = deadline - waited
+        if remaining <= 0 or (wait is not None and wait > remaining):
+            _record_wait(priority, waited, timed_out=True)
+            raise DiditQuotaTimeout(
+                f"Didit API quota not available within {deadline}s ({PRIORITY_NAMES[priority]} priority)",
+                retry_after=wait if wait is not None else CAS_RETRY_DELAY,
+            )
+        time.sleep(min(delay, remaining))
+
+def get_quota_metrics():
+    """Métricas de espera por prioridad de todos los workers."""
+    rows = {row["priority"]: row for row in DiditQuotaMetric.objects.values()}
+    result = {}
+    for name in PRIORITY_NAMES.values():
+        row = rows.get(name, {})
+        data = {
+            field: row.get(field, 0)
+            for field in ("requests", "waited", "timeouts", "total_wait_seconds", "max_wait_seconds")
+        }
+        data["avg_wait_seconds"] = data["total_wait_seconds"] / data["requests"] if data["requests"] else 0.0
+        result[name] = data
+    return result
+
 def get_client_token():
     try:
         # Combinar las credenciales
@@ -24,7 +189,7 @@ def get_client_token():
         }
         data = {"grant_type": "client_credentials"}
 
-        response = requests.post(AUTH_URL, headers=headers, data=data)
+        response = timed_request(requests.post, AUTH_URL, headers=headers, data=data)
         print("🔹 Token Request Status:", response.status_code)
         print("🔹 Token Response:", response.text[:500])
         response.raise_for_status()
@@ -36,7 +201,8 @@ def get_client_token():
             print("Detalles:", e.response.text)
         return None
 
-def create_session(features, callback_url, vendor_data):
+def create_session(features, callback_url, vendor_data, priority=PRIORITY_INTERACTIVE, deadline=None):
+    acquire_quota(priority, deadline)
 
     access_token = get_client_token()
     if not access_token:
@@ -52,7 +218,7 @@ def create_session(features, callback_url, vendor_data):
         "vendor_data": vendor_data
     }
 
-    response = requests.post(CREATE_SESSION_URL, headers=headers, json=body)
+    response = timed_request(requests.post, CREATE_SESSION_URL, headers=headers, json=body)
     print("🔹 Creando sesión en Didit con datos:")
     print(body)
     print("🔹 Respuesta Status:", response.status_code)
@@ -60,7 +226,9 @@ def create_session(features, callback_url, vendor_data):
     response.raise_for_status()
     return response.json()
 
-def retrieve_session(session_id):
+def retrieve_session(session_id, priority=PRIORITY_INTERACTIVE, deadline=None):
+    acquire_quota(priority, deadline)
+
     access_token = get_client_token()
     if not access_token:
         raise Exception("Error fetching client token")
@@ -70,14 +238,46 @@ def retrieve_session(session_id):
         "Content-Type": "application/json",
         "Authorization": f"Bearer {access_token}"
     }
-    response = requests.get(url, headers=headers)
+    response = timed_request(requests.get, url, headers=headers)
     print("🔹 Recuperando decision para session_id:", session_id)
     print("🔹 Decision Response Status:", response.status_code)
-    print("🔹 Decision Response:", response.text[:500])
+    # Sólo el inicio: la decisión incluye imágenes en base64 y .text decodificaría todo
+    print("🔹 Decision Response:", response.content[:500].decode("utf-8", errors="replace"))
     response.raise_for_status()
     return response.json()
 
-def update_session_status(session_id, new_status, comment=None):
+def retrieve_decision_fields(session_id, paths, max_bytes=None, priority=PRIORITY_INTERACTIVE, deadline=None):
+    """
+    Como retrieve_session, pero lee la decisión por streaming y devuelve sólo
+    los campos en ``paths`` (ver json_stream.extract_fields): las imágenes en
+    base64 del documento y la selfie nunca se cargan en memoria. Lanza
+    PayloadTooLarge si la respuesta supera ``max_bytes``.
+    """
+    acquire_quota(priority, deadline)
+
+    access_token = get_client_token()
+    if not access_token:
+        raise Exception("Error fetching client token")
+
+    url = RETRIEVE_DECISION_URL_TEMPLATE.format(session_id=session_id)
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {access_token}"
+    }
+    response = timed_request(requests.get, url, headers=headers, stream=True)
+    try:
+        print("🔹 Recuperando decision (streaming) para session_id:", session_id)
+        print("🔹 Decision Response Status:", response.status_code)
+        response.raise_for_status()
+        # Descomprime gzip/deflate al leer, igual que haría response.content
+        response.raw.decode_content = True
+        return extract_fields(response.raw, paths, max_bytes=max_bytes)
+    finally:
+        response.close()
+
+def update_session_status(session_id, new_status, comment=None, priority=PRIORITY_INTERACTIVE, deadline=None):
+    acquire_quota(priority, deadline)
+
     access_token = get_client_token()
     if not access_token:
         raise Exception("Error fetching client token for update.")
@@ -94,7 +294,7 @@ def update_session_status(session_id, new_status, comment=None):
     if comment:
         body["comment"] = comment
 
-    response = requests.patch(url, headers=headers, json=body)
+    response = timed_request(requests.patch, url, headers=headers, json=body)
     print("🔹 Update Status Response Status:", response.status_code)
     print("🔹 Update Status Response:", response.text[:500])
     response.raise_for_status()
@@ -0,0 +1,211 @@
+"""
+Bounded-memory extraction of a few fields from a JSON document.
+
+The document is read from a file-like object in chunks and scanned without
+building the object tree: only scalar values at the requested paths are
+decoded, everything else (e.g. base64 document images) is skipped while
+scanning, so memory use depends on the chunk size and not on the payload.
+"""
+import json
+import re
+
+# Wildcard for a single path element (any object key or array index)
+ANY = "*"
+
+MAX_DEPTH = 64
+_WHITESPACE = b" \t\n\r"
+_STRING_STOP = re.compile(rb'["\\]')
+_SCALAR = re.compile(rb"[^\s,\]}:]*")
+_SKIPPED = object()
+
+
+class PayloadTooLarge(Exception):
+    pass
+
+
+class StreamingJSONError(ValueError):
+    pass
+
+
+def _matches(pattern, path):
+    return len(pattern) == len(path) and all(p == ANY or p == k for p, k in zip(pattern, path))
+
+
+def _is_prefix(path, pattern):
+    return len(path) <= len(pattern) and all(p == ANY or p == k for p, k in zip(pattern, path))
+
+
+class _Scanner:
+
+    def __init__(self, stream, paths, max_bytes, max_value_length, chunk_size):
+        self.stream = stream
+        self.paths = [tuple(path) for path in paths]
+        self.max_bytes = max_bytes
+        self.max_value_length = max_value_length
+        self.chunk_size = chunk_size
+        self.buffer = b""
+        self.pos = 0
+        self.total = 0
+        self.eof = False
+        self.result = {}
+
+    def _fill(self):
+        """Reads the next chunk, keeping only the unread part of the buffer."""
+        if self.eof:
+            return False
+        data = self.stream.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.total += len(data)
+        if self.max_bytes is not None and self.total > self.max_bytes:
+            raise PayloadTooLarge(f"Payload larger than {self.max_bytes} bytes")
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        """Returns the next non-whitespace byte without consuming it (None at EOF)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos:self.pos + 1]
+            if not self._fill():
+                return None
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise StreamingJSONError(f"Expected {char!r} at byte {self.total - len(self.buffer) + self.pos}")
+        self.pos += 1
+
+    def _string(self, capture, limit):
+        """
+        Scans a string whose opening quote is the next byte. Returns the
+        decoded value, or _SKIPPED when not captured or longer than ``limit``.
+        """
+        self._expect(b'"')
+        parts = [] if capture else None
+        size = 0
+        while True:
+            match = _STRING_STOP.search(self.buffer, self.pos)
+            end = match.start() if match else len(self.buffer)
+            if parts is not None:
+                size += end - self.pos
+                if size > limit:
+                    parts = None
+                else:
+                    parts.append(self.buffer[self.pos:end])
+            self.pos = end
+            if match is None:
+                if not self._fill():
+                    raise StreamingJSONError("Unterminated string")
+                continue
+            if self.buffer[end:end + 1] == b'"':
+                self.pos = end + 1
+                break
+            # Backslash: keep the escape sequence together with the next byte
+            if self.pos + 1 >= len(self.buffer) and not self._fill():
+                raise StreamingJSONError("Unterminated string")
+            if parts is not None:
+                parts.append(self.buffer[self.pos:self.pos + 2])
+            self.pos += 2
+
+        if parts is None:
+            return _SKIPPED
+        try:
+            return json.loads(b'"' + b"".join(parts) + b'"')
+        except ValueError as e:
+            raise StreamingJSONError(f"Invalid string: {e}")
+
+    def _scalar(self, capture):
+        parts = []
+        size = 0
+        while True:
+            match = _SCALAR.match(self.buffer, self.pos)
+            parts.append(match.group())
+            size += match.end() - self.pos
+            self.pos = match.end()
+            if size > self.max_value_length:
+                raise StreamingJSONError("Invalid literal")
+            if self.pos < len(self.buffer) or not self._fill():
+                break
+        token = b"".join(parts)
+        try:
+            value = json.loads(token)
+        except ValueError:
+            raise StreamingJSONError(f"Invalid literal {token[:32]!r}")
+        return value if capture else _SKIPPED
+
+    def _store(self, path, value):
+        target = self.result
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = value
+
+    def value(self, path, depth=0):
+        """Scans one value; ``path`` is None inside parts nobody asked for."""
+        if depth > MAX_DEPTH:
+            raise StreamingJSONError("Document nested too deeply")
+        interested = path is not None and any(_is_prefix(path, pattern) for pattern in self.paths)
+        capture = interested and any(_matches(pattern, path) for pattern in self.paths)
+        char = self._peek()
+
+        if char == b"{":
+            self.pos += 1
+            if self._peek() == b"}":
+                self.pos += 1
+                return
+            while True:
+                key = self._string(interested, self.max_value_length)
+                self._expect(b":")
+                self.value(path + (key,) if key is not _SKIPPED else None, depth + 1)
+                char = self._peek()
+                self.pos += 1
+                if char == b"}":
+                    return
+                if char != b",":
+                    raise StreamingJSONError("Expected ',' or '}'")
+        elif char == b"[":
+            self.pos += 1
+            if self._peek() == b"]":
+                self.pos += 1
+                return
+            index = 0
+            while True:
+                self.value(path + (index,) if interested else None, depth + 1)
+                index += 1
+                char = self._peek()
+                self.pos += 1
+                if char == b"]":
+                    return
+                if char != b",":
+                    raise StreamingJSONError("Expected ',' or ']'")
+        elif char == b'"':
+            value = self._string(capture, self.max_value_length)
+        elif char is None:
+            raise StreamingJSONError("Unexpected end of document")
+        else:
+            value = self._scalar(capture)
+
+        if capture and value is not _SKIPPED:
+            self._store(path, value)
+
+    def run(self):
+        self.value(())
+        if self._peek() is not None:
+            raise StreamingJSONError("Extra data after the document")
+        return self.result
+
+
+def extract_fields(stream, paths, max_bytes=None, max_value_length=4096, chunk_size=64 * 1024):
+    """
+    Reads the JSON document in ``stream`` (any object with ``read(n)``
+    returning bytes) and returns a nested dict with only the scalar values
+    found at ``paths``, e.g. ``[("status",), ("decision", "kyc", ANY)]``.
+
+    Strings longer than ``max_value_length`` bytes are skipped even when
+    requested. Raises PayloadTooLarge when more than ``max_bytes`` are read
+    and StreamingJSONError when the document is not valid JSON.
+    """
+    return _Scanner(stream, paths, max_bytes, max_value_length, chunk_size).run()
@@ -0,0 +1,59 @@
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Below this number of estimated rows an exact COUNT(*) is cheap enough,
+# so small tables and narrow searches keep showing exact totals.
+EXACT_COUNT_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for very large admin tables.
+
+    Instead of running an exact ``COUNT(*)`` on every page load it reads the
+    planner statistics from PostgreSQL: ``pg_class.reltuples`` for unfiltered
+    querysets and the row estimate of ``EXPLAIN`` for filtered ones. Small
+    results (and non-PostgreSQL backends) still get an exact count.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[getattr(queryset, "db", "default")]
+        if connection.vendor != "postgresql" or not hasattr(queryset, "query"):
+            return super().count
+
+        try:
+            if queryset.query.where:
+                estimate = self._explain_estimate(queryset)
+            else:
+                estimate = self._table_estimate(queryset, connection)
+        except Exception as e:
+            print(f"⚠️ Error estimating row count, falling back to COUNT(*): {str(e)}")
+            return super().count
+
+        if estimate is None or estimate < EXACT_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
+    def _table_estimate(self, queryset, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 when the table has never been analyzed
+        if not row or row[0] < 0:
+            return None
+        return int(row[0])
+
+    def _explain_estimate(self, queryset):
+        plan = json.loads(queryset.order_by().explain(format="json"))
+        # Depending on the driver EXPLAIN (FORMAT JSON) comes back as a list or an object
+        if isinstance(plan, list):
+            plan = plan[0]
+        return int(plan["Plan"]["Plan Rows"])
@@ -0,0 +1,39 @@
+import contextvars
+import time
+
+# Outbound calls of the request being profiled; None when profiling is off
+_outbound_calls = contextvars.ContextVar("kyc_outbound_calls", default=None)
+
+
+def start_outbound_capture():
+    return _outbound_calls.set([])
+
+
+def stop_outbound_capture(token):
+    calls = _outbound_calls.get() or []
+    _outbound_calls.reset(token)
+    return calls
+
+
+def timed_request(send, url, **kwargs):
+    """
+    Calls ``send(url, **kwargs)`` (e.g. ``requests.post``) and records its
+    timing when the current request is being profiled.
+    """
+    calls = _outbound_calls.get()
+    if calls is None:
+        return send(url, **kwargs)
+
+    start = time.perf_counter()
+    status_code = None
+    try:
+        response = send(url, **kwargs)
+        status_code = response.status_code
+        return response
+    finally:
+        calls.append({
+            "method": getattr(send, "__name__", "request").upper(),
+            "url": url,
+            "status": status_code,
+            "ms": round((time.perf_counter() - start) * 1000, 3),
+        })
@@ -0,0 +1,124 @@
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.utils import timezone
+
+from ..models import SessionDetails
+from .status_cache import make_entry, store_statuses_on_commit
+
+# Session statuses (lowercased Didit statuses) grouped by how far along the
+# verification is. A session only moves forward; a final status can only be
+# replaced by another final status from a newer event (see can_transition).
+STATUS_RANKS = {
+    "pending": 0,
+    "not started": 0,
+    "in progress": 1,
+    "in review": 2,
+}
+FINAL_STATUSES = {"completed", "approved", "declined", "rejected", "failed", "expired", "abandoned"}
+FINAL_RANK = 3
+# Statuses we do not know about are treated as in-progress ones
+UNKNOWN_RANK = 1
+
+APPLIED = "applied"
+STALE = "stale"
+NOT_FOUND = "not_found"
+
+# Conditional UPDATE attempts before an event that keeps losing races is dropped
+MAX_ATTEMPTS = 5
+
+
+def status_rank(status):
+    if status in FINAL_STATUSES:
+        return FINAL_RANK
+    return STATUS_RANKS.get(status, UNKNOWN_RANK)
+
+
+def can_transition(current, new):
+    """
+    Whether a session in status ``current`` may move to status ``new``: forward
+    through the ranks, or from a final status to another one when Didit sends a
+    new decision (e.g. after a manual review via UpdateStatusAPIView). A final
+    status never goes back to an in-progress one.
+    """
+    if current == new:
+        return False
+    if current in FINAL_STATUSES:
+        return new in FINAL_STATUSES
+    return status_rank(new) > status_rank(current)
+
+
+def is_newer(current_status, current_version, version):
+    """
+    Whether an event with ``version`` is recent enough to change a session in
+    ``current_status`` last changed by an event with ``current_version``.
+    Didit timestamps are whole seconds, so a forward move (already ordered by
+    rank in can_transition) may tie with the previous event; replacing a final
+    decision needs a strictly newer event.
+    """
+    if current_status in FINAL_STATUSES:
+        return version > current_version
+    return version >= current_version
+
+
+def newer_version_lookup(current_status, version):
+    """The is_newer condition as queryset filter arguments, for conditional UPDATEs."""
+    if current_status in FINAL_STATUSES:
+        return {"version__lt": version}
+    return {"version__lte": version}
+
+
+def event_version(event):
+    """
+    Monotonic version of a webhook event in microseconds since the epoch,
+    taken from its ``timestamp``/``created_at`` (unix seconds or ISO 8601).
+    Events without a usable timestamp get the time they were received.
+    """
+    for key in ("timestamp", "created_at"):
+        value = event.get(key)
+        if value in (None, ""):
+            continue
+        try:
+            if isinstance(value, (int, float)) or str(value).replace(".", "", 1).isdigit():
+                return int(float(value) * 1_000_000)
+            moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment, dt_timezone.utc)
+            return int(moment.timestamp() * 1_000_000)
+        except ValueError:
+            continue
+    return time.time_ns() // 1000
+
+
+def apply_transition(session_id, new_status, version):
+    """
+    Moves a session to ``new_status`` with a single conditional UPDATE
+    (``WHERE status = <observed> AND version <= <version>``, ``<`` when
+    replacing a final status), so stale or out-of-order events are dropped
+    without reading the row with SELECT ... FOR UPDATE. The UPDATE still locks
+    the row until the caller's transaction commits.
+
+    Returns ``(outcome, previous)`` where outcome is APPLIED, STALE or
+    NOT_FOUND and ``previous`` holds the session values seen before the update.
+    """
+    previous = None
+    for _ in range(MAX_ATTEMPTS):
+        try:
+            previous = SessionDetails.objects.values(
+                "pk", "status", "version", "created_at", "personal_data_id"
+            ).get(session_id=session_id)
+        except SessionDetails.DoesNotExist:
+            return NOT_FOUND, None
+        if not is_newer(previous["status"], previous["version"], version) or \
+                not can_transition(previous["status"], new_status):
+            return STALE, previous
+
+        now = timezone.now()
+        updated = SessionDetails.objects.filter(
+            pk=previous["pk"], status=previous["status"], **newer_version_lookup(previous["status"], version)
+        ).update(status=new_status, version=version, updated_at=now)
+        if updated:
+            store_statuses_on_commit([make_entry(session_id, new_status, now)])
+            return APPLIED, previous
+        # Another event changed the session in the meantime: re-read and retry
+    return STALE, previous
@@ -0,0 +1,275 @@
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from ..models import SessionDetails, SessionStatusBucket, CompletionTimeBucket
+from .session_state import FINAL_STATUSES as COMPLETED_STATUSES
+
+# Upper bounds (seconds) of the time-to-completion histogram; longer
+# durations are counted in the last bucket.
+DURATION_BOUNDS = (
+    60, 5 * 60, 15 * 60, 30 * 60,
+    3600, 3 * 3600, 6 * 3600, 12 * 3600,
+    86400, 3 * 86400, 7 * 86400, 30 * 86400,
+)
+
+
+def _shard():
+    """
+    Counter shard written by this worker thread. Concurrent writers are
+    different threads or processes, so they usually land on different rows;
+    KYC_STATS_SHARDS (default 8) is the number of rows per counter.
+    """
+    return threading.get_native_id() % max(1, getattr(settings, "KYC_STATS_SHARDS", 8))
+
+
+def truncate_hour(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def duration_bound(seconds):
+    for bound in DURATION_BOUNDS:
+        if seconds <= bound:
+            return bound
+    return DURATION_BOUNDS[-1]
+
+
+def _increment(model, lookup, increments):
+    """
+    Adds ``increments`` to the counter row identified by ``lookup`` with an
+    F-expression UPDATE, creating the row the first time it is needed.
+    """
+    expressions = {field: F(field) + value for field, value in increments.items()}
+    if model.objects.filter(**lookup).update(**expressions):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **increments)
+    except IntegrityError:
+        # Another worker created the row in the meantime
+        model.objects.filter(**lookup).update(**expressions)
+
+
+def record_transitions(transitions, at=None):
+    """
+    Updates the funnel counters for a batch of ``(old_status, new_status, created_at)``
+    transitions that happened at ``at`` (now by default). ``old_status`` is None
+    for newly created sessions.
+
+    The counter rows are locked by these UPDATEs until the caller's transaction
+    commits. Each worker thread writes to its own shard (see ``_shard``), so
+    only concurrent transactions that share a shard wait for each other.
+    """
+    at = at or timezone.now()
+    hour = truncate_hour(at)
+    status_deltas = {}
+    durations = Counter()
+
+    for old_status, new_status, created_at in transitions:
+        if old_status == new_status:
+            continue
+        if old_status is not None:
+            status_deltas.setdefault(old_status, Counter())["exited"] += 1
+        status_deltas.setdefault(new_status, Counter())["entered"] += 1
+        if created_at and new_status in COMPLETED_STATUSES and old_status not in COMPLETED_STATUSES:
+            seconds = (at - created_at).total_seconds()
+            durations[duration_bound(max(seconds, 0))] += 1
+
+    if not status_deltas:
+        return
+
+    shard = _shard()
+    # No savepoint: callers already run this inside the transaction of the session write
+    with transaction.atomic(savepoint=False):
+        # Sorted so concurrent batches lock the counter rows in the same order
+        for status in sorted(status_deltas):
+            _increment(
+                SessionStatusBucket, {"hour": hour, "status": status, "shard": shard}, dict(status_deltas[status])
+            )
+        for bound in sorted(durations):
+            _increment(
+                CompletionTimeBucket, {"hour": hour, "le_seconds": bound, "shard": shard}, {"count": durations[bound]}
+            )
+
+
+def record_transition(old_status, new_status, created_at=None, at=None):
+    record_transitions([(old_status, new_status, created_at)], at=at)
+
+
+def median_from_histogram(histogram):
+    """
+    Approximates the median from ``{le_seconds: count}`` by linear
+    interpolation inside the bucket that contains it.
+    """
+    total = sum(histogram.values())
+    if not total:
+        return None
+    half = total / 2
+    cumulative = 0
+    lower = 0
+    for bound in sorted(histogram):
+        count = histogram[bound]
+        if count and cumulative + count >= half:
+            return lower + (bound - lower) * (half - cumulative) / count
+        cumulative += count
+        lower = bound
+    return lower
+
+
+def get_funnel_stats(hours=24):
+    """
+    Reads the funnel statistics from the counter tables only: current
+    sessions per status, hourly transitions over the last ``hours`` hours
+    and the median time-to-completion over that same window.
+
+    The counters only see transitions recorded since they were deployed, so
+    sessions that already existed make ``status_counts`` wrong (e.g. a
+    negative ``pending`` count once they move on) until the
+    ``rebuild_kyc_stats`` command has been run once.
+    """
+    since = truncate_hour(timezone.now()) - timedelta(hours=hours - 1)
+
+    status_counts = {
+        row["status"]: row["entered"] - row["exited"]
+        for row in SessionStatusBucket.objects.values("status").annotate(
+            entered=Sum("entered"), exited=Sum("exited")
+        )
+    }
+
+    hourly = [
+        {"hour": row["hour"].isoformat(), "status": row["status"], "count": row["count"]}
+        for row in SessionStatusBucket.objects.filter(hour__gte=since, entered__gt=0)
+        .values("hour", "status")
+        .annotate(count=Sum("entered"))
+        .order_by("hour", "status")
+    ]
+
+    histogram = {
+        row["le_seconds"]: row["count"]
+        for row in CompletionTimeBucket.objects.filter(hour__gte=since)
+        .values("le_seconds")
+        .annotate(count=Sum("count"))
+    }
+
+    return {
+        "window_hours": hours,
+        "status_counts": status_counts,
+        "hourly": hourly,
+        "completed": sum(histogram.values()),
+        "median_completion_seconds": median_from_histogram(histogram),
+    }
+
+
+# Key of the PostgreSQL advisory lock that keeps two rebuilds from overlapping
+REBUILD_LOCK_ID = 0x6B79_6373  # "kycs"
+
+
+def _counter_totals():
+    """Current counters summed over shards: ``({(hour, status): Counter}, Counter({(hour, le_seconds): n}))``."""
+    status_totals = {
+        (row["hour"], row["status"]): Counter(entered=row["total_entered"], exited=row["total_exited"])
+        for row in SessionStatusBucket.objects.values("hour", "status").annotate(
+            total_entered=Sum("entered"), total_exited=Sum("exited")
+        )
+    }
+    duration_totals = Counter({
+        (row["hour"], row["le_seconds"]): row["total"]
+        for row in CompletionTimeBucket.objects.values("hour", "le_seconds").annotate(total=Sum("count"))
+    })
+    return status_totals, duration_totals
+
+
+def _lock_counter_tables():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"LOCK TABLE {SessionStatusBucket._meta.db_table}, {CompletionTimeBucket._meta.db_table} "
+            "IN EXCLUSIVE MODE"
+        )
+
+
+def rebuild_stats(chunk_size=2000):
+    """
+    Recomputes every counter from SessionDetails. Only the current status of
+    each session is known, so a session counts as created in the hour of
+    ``created_at`` and as moved to its current status in the hour of ``updated_at``.
+    Returns the number of sessions processed.
+
+    SessionDetails is scanned without blocking anyone, in a REPEATABLE READ
+    transaction that also reads the current counters, so both see the same
+    transitions. The counter tables are then locked only to replace them:
+    whatever the counters gained since that snapshot (transitions committed
+    during the scan) is added on top of the rebuilt values, and transitions
+    still in flight wait for the lock and apply after it. None is lost or
+    counted twice.
+    """
+    status_deltas = {}
+    durations = Counter()
+    processed = 0
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", [REBUILD_LOCK_ID])
+    try:
+        isolate = not connection.in_atomic_block
+        with transaction.atomic():
+            if isolate:
+                with connection.cursor() as cursor:
+                    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            status_before, durations_before = _counter_totals()
+
+            sessions = (
+                SessionDetails.objects.filter(session_id__isnull=False)
+                .values_list("status", "created_at", "updated_at")
+                .iterator(chunk_size=chunk_size)
+            )
+            for status, created_at, updated_at in sessions:
+                processed += 1
+                created_hour = truncate_hour(created_at)
+                status_deltas.setdefault((created_hour, "pending"), Counter())["entered"] += 1
+                if status == "pending":
+                    continue
+                updated_hour = truncate_hour(updated_at)
+                status_deltas.setdefault((updated_hour, "pending"), Counter())["exited"] += 1
+                status_deltas.setdefault((updated_hour, status), Counter())["entered"] += 1
+                if status in COMPLETED_STATUSES:
+                    seconds = (updated_at - created_at).total_seconds()
+                    durations[(updated_hour, duration_bound(max(seconds, 0)))] += 1
+
+        with transaction.atomic():
+            _lock_counter_tables()
+            # Transitions committed after the scan's snapshot
+            status_after, durations_after = _counter_totals()
+            for key, counts in status_after.items():
+                before = status_before.get(key, Counter())
+                status_deltas.setdefault(key, Counter()).update({
+                    field: counts[field] - before[field] for field in ("entered", "exited")
+                })
+            for key, count in durations_after.items():
+                durations[key] += count - durations_before[key]
+
+            SessionStatusBucket.objects.all().delete()
+            CompletionTimeBucket.objects.all().delete()
+            SessionStatusBucket.objects.bulk_create(
+                [
+                    SessionStatusBucket(hour=hour, status=status, entered=counts["entered"], exited=counts["exited"])
+                    for (hour, status), counts in status_deltas.items()
+                ],
+                batch_size=chunk_size,
+            )
+            CompletionTimeBucket.objects.bulk_create(
+                [
+                    CompletionTimeBucket(hour=hour, le_seconds=bound, count=count)
+                    for (hour, bound), count in durations.items()
+                    if count
+                ],
+                batch_size=chunk_size,
+            )
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [REBUILD_LOCK_ID])
+
+    return processed
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from ..models import SessionDetails
+
+
+def _key(session_id):
+    return f"kyc:status:{session_id}"
+
+
+def _timeout():
+    # Without a shared cache (see CACHES) this also bounds how stale other workers can be
+    return getattr(settings, "KYC_STATUS_CACHE_TIMEOUT", 60)
+
+
+def make_entry(session_id, status, updated_at):
+    """Cached representation of a session status, with its strong ETag."""
+    return {
+        "session_id": session_id,
+        "status": status,
+        "updated_at": updated_at.isoformat(),
+        "etag": f'"{int(updated_at.timestamp() * 1_000_000):x}"',
+    }
+
+
+def get_cached_status(session_id):
+    return cache.get(_key(session_id))
+
+
+def get_session_status(session_id):
+    """
+    Returns the cached status entry of a session, reading only
+    ``status``/``updated_at`` through the session_id index on a miss.
+    Returns None when the session does not exist.
+    """
+    entry = get_cached_status(session_id)
+    if entry is not None:
+        return entry
+    try:
+        row = SessionDetails.objects.values_list("status", "updated_at").get(session_id=session_id)
+    except SessionDetails.DoesNotExist:
+        return None
+    entry = make_entry(session_id, *row)
+    # add, not set: a status written through by a webhook that committed after
+    # our read is newer and must not be replaced by this one
+    cache.add(_key(session_id), entry, _timeout())
+    return entry
+
+
+def store_statuses_on_commit(entries):
+    """Writes the new status entries to the cache once the transaction commits."""
+    if entries:
+        transaction.on_commit(
+            lambda: cache.set_many({_key(entry["session_id"]): entry for entry in entries}, _timeout())
+        )
+
+
+def invalidate_statuses(session_ids):
+    """Drops the cached entries once the transaction commits (the next read refills them)."""
+    keys = [_key(session_id) for session_id in session_ids if session_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,160 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import UserDetails, SessionDetails
+from .stats import record_transitions
+from .session_state import can_transition, event_version, is_newer
+from .json_stream import ANY
+from .status_cache import make_entry, store_statuses_on_commit
+
+# Fields of a Didit webhook payload we use; the rest (e.g. document images) is skipped
+WEBHOOK_FIELDS = (
+    ("session_id",),
+    ("id",),
+    ("status",),
+    ("timestamp",),
+    ("created_at",),
+    ("decision", "kyc", ANY),
+)
+
+# Fields read from the full decision fetched from Didit once a session completes
+DECISION_FIELDS = (
+    ("status",),
+    ("kyc", ANY),
+)
+
+
+def parse_event(event):
+    """
+    Returns ``(session_id, status, kyc_data)`` from a Didit webhook payload.
+    ``session_id`` or ``status`` are None when the payload is incomplete or
+    malformed (ids and status must be strings, ``decision``/``kyc`` objects).
+    """
+    session_id = event.get("session_id") or event.get("id")
+    if not isinstance(session_id, str):
+        session_id = None
+    didit_status = event.get("status")
+    decision = event.get("decision") or {}
+    kyc_data = (decision.get("kyc") or {}) if isinstance(decision, dict) else None
+    if not isinstance(didit_status, str) or not isinstance(kyc_data, dict):
+        return session_id, None, {}
+    return session_id, didit_status, kyc_data
+
+
+def personal_data_updates(kyc_data):
+    """Maps the ``decision.kyc`` fields sent by Didit to UserDetails fields."""
+    updates = {}
+    if kyc_data.get("document_number"):
+        updates["document_id"] = kyc_data["document_number"]
+    if kyc_data.get("date_of_birth"):
+        updates["date_of_birth"] = kyc_data["date_of_birth"]
+    if kyc_data.get("document_type"):
+        updates["document_type"] = kyc_data["document_type"]
+    if kyc_data.get("last_name"):
+        updates["last_name"] = kyc_data["last_name"]
+    if kyc_data.get("issuing_state_name"):
+        updates["nationality"] = kyc_data["issuing_state_name"]
+    return updates
+
+
+def clean_event(didit_status, kyc_data):
+    """
+    Returns ``(new_status, updates)`` with the session status and the
+    UserDetails updates validated against their model fields (types,
+    max_length), raising ValidationError for values the database would reject.
+    """
+    new_status = SessionDetails._meta.get_field("status").clean(didit_status.lower(), None)
+    updates = {
+        field: UserDetails._meta.get_field(field).clean(value, None)
+        for field, value in personal_data_updates(kyc_data).items()
+    }
+    return new_status, updates
+
+
+def apply_webhook_events(events, batch_size=500):
+    """
+    Applies a batch of Didit webhook events in one transaction: all sessions
+    are fetched with a single query and written back with ``bulk_update``.
+    Events follow the same state machine as ``didit_webhook`` and are applied
+    in version (event timestamp) order; stale ones are dropped. The batch's
+    sessions are locked while it runs so concurrent webhooks cannot interleave.
+    Unlike ``didit_webhook`` no decision is fetched from Didit.
+
+    Returns one ``{"index", "session_id", "outcome"}`` dict per event, where
+    outcome is "updated", "stale", "not_found" or "invalid".
+    """
+    parsed = []
+    for index, event in enumerate(events):
+        if not isinstance(event, dict):
+            parsed.append((index, None, None, {}, 0))
+            continue
+        parsed.append((index, *parse_event(event), event_version(event)))
+
+    session_ids = {session_id for _, session_id, didit_status, _, _ in parsed if session_id and didit_status}
+    results = [{"index": index, "session_id": session_id} for index, session_id, _, _, _ in parsed]
+    now = timezone.now()
+
+    with transaction.atomic():
+        # Rows are locked in pk order so overlapping batches cannot deadlock
+        sessions = (
+            SessionDetails.objects.select_related("personal_data")
+            .select_for_update(of=("self",))
+            .order_by("pk")
+            .in_bulk(sorted(session_ids), field_name="session_id")
+        )
+        changed_sessions = {}
+        changed_users = {}
+        user_fields = set()
+        transitions = []
+
+        for index, session_id, didit_status, kyc_data, version in sorted(parsed, key=lambda item: item[4]):
+            result = results[index]
+            if not session_id or not didit_status:
+                result["outcome"] = "invalid"
+                continue
+            session_details = sessions.get(session_id)
+            if session_details is None:
+                result["outcome"] = "not_found"
+                continue
+
+            try:
+                new_status, updates = clean_event(didit_status, kyc_data)
+            except ValidationError:
+                result["outcome"] = "invalid"
+                continue
+
+            result["status"] = new_status
+            if not is_newer(session_details.status, session_details.version, version) or \
+                    not can_transition(session_details.status, new_status):
+                result["outcome"] = "stale"
+                continue
+
+            transitions.append((session_details.status, new_status, session_details.created_at))
+            session_details.status = new_status
+            session_details.version = version
+            session_details.updated_at = now
+            changed_sessions[session_details.pk] = session_details
+
+            personal_data = session_details.personal_data
+            for field, value in updates.items():
+                if getattr(personal_data, field) != value:
+                    setattr(personal_data, field, value)
+                    user_fields.add(field)
+                    changed_users[personal_data.pk] = personal_data
+            result["outcome"] = "updated"
+
+        if changed_sessions:
+            SessionDetails.objects.bulk_update(
+                changed_sessions.values(), ["status", "version", "updated_at"], batch_size=batch_size
+            )
+        if changed_users:
+            UserDetails.objects.bulk_update(
+                changed_users.values(), sorted(user_fields), batch_size=batch_size
+            )
+        record_transitions(transitions, at=now)
+        store_statuses_on_commit([
+            make_entry(session.session_id, session.status, now) for session in changed_sessions.values()
+        ])
+
+    return results
@@ -1,21 +1,35 @@
 import json
 import hmac
+import math
 import hashlib
 from django.conf import settings
-from django.http import JsonResponse, HttpResponse
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_GET
 from django.views.decorators.csrf import csrf_exempt
+from django.db import transaction
 from django.shortcuts import render, redirect, get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.decorators import api_view
 from datetime import datetime, timedelta
 
 
 
 from .models import UserDetails, SessionDetails
-from .utils.didit_client import create_session, retrieve_session, update_session_status
+from .utils.didit_client import (
+    create_session, retrieve_session, retrieve_decision_fields, update_session_status, get_quota_metrics,
+    PRIORITY_WEBHOOK, DiditQuotaTimeout
+)
+from .utils.stats import record_transition, get_funnel_stats
+from .utils.webhook_events import parse_event, clean_event, apply_webhook_events, WEBHOOK_FIELDS, DECISION_FIELDS
+from .utils.json_stream import extract_fields, PayloadTooLarge, StreamingJSONError
+from .utils.status_cache import get_session_status
+from .utils.session_state import event_version, apply_transition, APPLIED, STALE, NOT_FOUND
 
 def kyc_test(request):
     # Lee el token desde el archivo .env (a través de settings)
@@ -26,6 +40,13 @@ def kyc_test(request):
     }
     return render(request, "kyc/test.html", context)
 
+def quota_busy_response(error):
+    """503 with Retry-After when the Didit API quota did not free up in time; the call can be retried."""
+    response = Response({"error": "Verification service busy, please retry shortly."},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response["Retry-After"] = str(max(1, math.ceil(error.retry_after or 1)))
+    return response
+
 class DiditKYCAPIView(APIView):
     """
     POST /kyc/api/kyc/
@@ -68,7 +89,9 @@ class DiditKYCAPIView(APIView):
             
             # Update the record with all session data
             session_details.session_id = session_data["session_id"]
-            session_details.save()
+            with transaction.atomic():
+                session_details.save()
+                record_transition(None, session_details.status)
 
             # Create response
             response_data = {
@@ -84,7 +107,13 @@ class DiditKYCAPIView(APIView):
                 response_data["expires_at"] = (datetime.now() + timedelta(days=7)).isoformat()
             
             return Response(response_data, status=status.HTTP_201_CREATED)
-            
+
+        except DiditQuotaTimeout as e:
+            print("⚠️ Didit quota busy in DiditKYCAPIView:", str(e))
+            # No session in Didit yet: the client retries and creates the local records again
+            personal_data.delete()
+            session_details.delete()
+            return quota_busy_response(e)
         except Exception as e:
             print("❌ Error in DiditKYCAPIView:", str(e))
             personal_data.delete()
@@ -98,7 +127,7 @@ def didit_webhook(request):
     Endpoint to receive status updates from Didit.
     """
     print("✅ Webhook received!")
-    print(f"Received data: {request.body.decode('utf-8')}")
+    print(f"Content length: {request.META.get('CONTENT_LENGTH')}")
     
     # Log for the method used
     print(f"Method: {request.method}")
@@ -112,61 +141,65 @@ def didit_webhook(request):
 
     if request.method == "POST":
         try:
-            data = json.loads(request.body)
+            # Stream the body and keep only the fields we use, without loading embedded images
+            max_bytes = getattr(settings, "KYC_WEBHOOK_MAX_BYTES", 10 * 1024 * 1024)
+            if int(request.META.get("CONTENT_LENGTH") or 0) > max_bytes:
+                return JsonResponse({"error": "Payload too large"}, status=413)
+            try:
+                data = extract_fields(request, WEBHOOK_FIELDS, max_bytes=max_bytes)
+            except PayloadTooLarge:
+                return JsonResponse({"error": "Payload too large"}, status=413)
+            except StreamingJSONError as e:
+                return JsonResponse({"error": f"Invalid JSON: {str(e)}"}, status=400)
             
             # Extract main data
-            session_id = data.get("session_id") or data.get("id")
-            didit_status = data.get("status")
+            session_id, didit_status, kyc_data = parse_event(data)
 
             if not session_id or not didit_status:
-                return JsonResponse({"error": "Incomplete data (session_id/id, status)"}, status=400)
+                return JsonResponse({"error": "Incomplete or invalid data (session_id/id, status)"}, status=400)
+
+            try:
+                new_status, updates = clean_event(didit_status, kyc_data)
+            except ValidationError as e:
+                return JsonResponse({"error": f"Invalid data: {'; '.join(e.messages)}"}, status=400)
+            version = event_version(data)
+
+            # Conditional update: stale or out-of-order events are dropped without SELECT ... FOR UPDATE
+            with transaction.atomic():
+                outcome, previous = apply_transition(session_id, new_status, version)
+                if outcome == APPLIED:
+                    # Save nationality, date of birth, document type, etc. if available
+                    if updates:
+                        UserDetails.objects.filter(id=previous["personal_data_id"]).update(**updates)
+                    record_transition(previous["status"], new_status, created_at=previous["created_at"])
+
+            if outcome == NOT_FOUND:
+                return JsonResponse({"error": f"Session {session_id} not found"}, status=404)
+            if outcome == STALE:
+                print(f"⚠️ Stale webhook ignored: Session {session_id}, Status: {didit_status}, "
+                      f"current status: {previous['status']}")
+                return JsonResponse({
+                    "message": "Stale event ignored",
+                    "status": previous["status"],
+                    "session_id": session_id
+                })
 
-            session_details = get_object_or_404(SessionDetails, session_id=session_id)
-                
-            # Update the status
-            session_details.status = didit_status.lower()
-            
-            # Save nationality, date of birth and document type if available
-            kyc_data = data.get("decision", {}).get("kyc", {})
-            personal_data = session_details.personal_data
-            personal_data.nationality = kyc_data.get("issuing_state_name")
-            date_of_birth = kyc_data.get("date_of_birth")
-            document_type = kyc_data.get("document_type")
-            document_id = kyc_data.get("document_number")
-            last_name = kyc_data.get("last_name")
-            
-            # In didit_webhook, use update_or_create instead of separate operations:
-            personal_data_updates = {}
-            if document_id:
-                personal_data_updates['document_id'] = document_id
-            if date_of_birth:
-                personal_data_updates['date_of_birth'] = date_of_birth
-            if document_type:
-                personal_data_updates['document_type'] = document_type
-            if last_name:
-                personal_data_updates['last_name'] = last_name
-            
-            # Add nationality if it exists
-            if kyc_data.get("issuing_state_name"):
-                personal_data_updates['nationality'] = kyc_data.get("issuing_state_name")
-
-            if personal_data_updates:
-                UserDetails.objects.filter(id=session_details.personal_data.id).update(**personal_data_updates)
-                # Refresh the instance from the database
-                personal_data.refresh_from_db()
-            
-            personal_data.save()
-            
             # If the status is "completed", get the complete decision
             if didit_status.upper() == "COMPLETED":
                 try:
-                    decision_data = retrieve_session(session_id)
-                    print(f"✅ Decision data retrieved for session {session_id}")
+                    # Streamed: only the fields we use are kept, the embedded images are skipped
+                    decision_max_bytes = getattr(settings, "KYC_DECISION_MAX_BYTES", 50 * 1024 * 1024)
+                    # Short quota deadline: Didit times out and retries a webhook that waits too long,
+                    # and the retry is dropped as stale, so the lookup would never happen
+                    decision_data = retrieve_decision_fields(
+                        session_id, DECISION_FIELDS, max_bytes=decision_max_bytes, priority=PRIORITY_WEBHOOK,
+                        deadline=getattr(settings, "KYC_WEBHOOK_DIDIT_DEADLINE", 2),
+                    )
+                    print(f"✅ Decision data retrieved for session {session_id}: {decision_data.get('status')}")
                 except Exception as e:
                     print(f"⚠️ Error retrieving complete decision: {str(e)}")
                     # Don't fail the webhook if this fails
-            
-            session_details.save()
+
             print(f"✅ Webhook processed: Session {session_id}, Status: {didit_status}")
 
             return JsonResponse({
@@ -182,6 +215,63 @@ def didit_webhook(request):
     else:
         return JsonResponse({"error": "Method not allowed"}, status=405)
 
+class BulkWebhookImportAPIView(APIView):
+    """
+    POST /kyc/api/webhook/bulk/
+    Applies a batch of Didit webhook events (a list, or {"events": [...]})
+    in one transaction, e.g. to backfill after an outage or a Didit replay.
+    Requires a JWT of a staff user.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        events = request.data.get("events") if isinstance(request.data, dict) else request.data
+        if not isinstance(events, list) or not events:
+            return Response({"error": "Expected a non-empty list of events."}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_events = getattr(settings, "KYC_BULK_WEBHOOK_MAX_EVENTS", 5000)
+        if len(events) > max_events:
+            return Response({"error": f"At most {max_events} events per request."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = apply_webhook_events(events)
+        return Response({
+            "processed": len(results),
+            "updated": sum(1 for result in results if result["outcome"] == "updated"),
+            "results": results,
+        }, status=status.HTTP_200_OK)
+
+@require_GET
+def session_status(request, session_id):
+    """
+    GET /kyc/api/status/<session_id>/
+    Lightweight local status of a session (no call to Didit). Responses carry
+    a strong ETag; a matching If-None-Match gets 304, served from the cache
+    without touching the database when the status is cached.
+    """
+    entry = get_session_status(session_id)
+    if entry is None:
+        return JsonResponse({"error": f"Session {session_id} not found"}, status=404)
+
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        if "*" in etags or entry["etag"] in etags:
+            response = HttpResponseNotModified()
+            response["ETag"] = entry["etag"]
+            response["Cache-Control"] = "no-cache"
+            return response
+
+    response = JsonResponse({
+        "session_id": entry["session_id"],
+        "status": entry["status"],
+        "updated_at": entry["updated_at"],
+    })
+    response["ETag"] = entry["etag"]
+    response["Cache-Control"] = "no-cache"
+    return response
+
 class RetrieveSessionAPIView(APIView):
     """
     GET /kyc/api/retrieve/<session_id>/
@@ -191,6 +281,8 @@ class RetrieveSessionAPIView(APIView):
         try:
             data = retrieve_session(session_id)
             return Response(data, status=status.HTTP_200_OK)
+        except DiditQuotaTimeout as e:
+            return quota_busy_response(e)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -206,7 +298,25 @@ class UpdateStatusAPIView(APIView):
         try:
             updated_data = update_session_status(session_id, new_status)
             return Response(updated_data, status=status.HTTP_200_OK)
+        except DiditQuotaTimeout as e:
+            return quota_busy_response(e)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-
+class KYCStatsAPIView(APIView):
+    """
+    GET /kyc/api/stats/?hours=24
+    Returns live KYC funnel statistics read from the incrementally
+    maintained counter tables, plus the Didit quota wait-time metrics.
+    """
+    def get(self, request):
+        try:
+            hours = int(request.query_params.get("hours", 24))
+        except ValueError:
+            return Response({"error": "'hours' must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= hours <= 24 * 31:
+            return Response({"error": "'hours' must be between 1 and 744"}, status=status.HTTP_400_BAD_REQUEST)
+        data = get_funnel_stats(hours)
+        # Wait-time metrics of the Didit API quota scheduler (all workers)
+        data["didit_quota"] = get_quota_metrics()
+        return Response(data, status=status.HTTP_200_OK)
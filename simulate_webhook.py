@@ -4,6 +4,7 @@ import hashlib
 import json
 import os
 import sys
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
@@ -56,7 +57,8 @@ status = statuses.get(option, "COMPLETED")
 payload = {
     "id": session_id,
     "status": status,
-    "timestamp": "2025-03-03T16:30:00Z"
+    # El servidor descarta eventos con un timestamp anterior al último aplicado
+    "timestamp": datetime.now(timezone.utc).isoformat()
 }
 
 # Añadir datos adicionales para pruebas